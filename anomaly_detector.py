@@ -0,0 +1,89 @@
+"""
+Online per-transaction anomaly detection (complements SpendingAdvisor.unusual_spending):
+- Keeps a running mean/variance of amounts per (account, category) and
+  (account, merchant) with Welford updates, optionally exponentially decayed so
+  old behaviour fades out.
+- Each new transaction is scored in O(1) against those stats, then folded in;
+  no batch re-aggregation of the history is needed.
+- State is three floats per key, small enough for feeds covering millions of accounts.
+"""
+import math
+import pandas as pd
+
+
+class RunningStats:
+    """Weighted Welford accumulator; decay=1.0 gives the plain running mean/variance."""
+    __slots__ = ("weight", "mean", "m2")
+
+    def __init__(self, weight: float = 0.0, mean: float = 0.0, m2: float = 0.0):
+        self.weight = weight
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, x: float, decay: float = 1.0):
+        self.weight = self.weight * decay + 1.0
+        delta = x - self.mean
+        self.mean += delta / self.weight
+        self.m2 = self.m2 * decay + delta * (x - self.mean)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.weight) if self.weight > 0 else 0.0
+
+    def zscore(self, x: float):
+        std = self.std
+        return (x - self.mean) / std if std > 0 else None
+
+
+class StreamingAnomalyDetector:
+    def __init__(self, z_thresh: float = 3.0, decay: float = 1.0, min_count: int = 5,
+                 fields=("category", "merchant")):
+        self.z_thresh = z_thresh
+        self.decay = decay  # e.g. 0.99 weights the last ~100 transactions per key
+        self.min_count = min_count  # effective weight needed before a key can flag anything
+        self.fields = tuple(fields)
+        self._stats = {}  # (account, field, value) -> RunningStats
+
+    def __len__(self):
+        return len(self._stats)
+
+    def score(self, txn: dict, account=None) -> dict:
+        """z-score of txn["amount"] per field, without updating state (None = not enough history)."""
+        amount = float(txn["amount"])
+        scores = {}
+        for field in self.fields:
+            stats = self._stats.get((account, field, txn.get(field)))
+            if stats is None or stats.weight < self.min_count:
+                scores[field] = None
+            else:
+                scores[field] = stats.zscore(amount)
+        return scores
+
+    def observe(self, txn: dict, account=None) -> dict:
+        """Score a new transaction, then fold it into the running stats."""
+        scores = self.score(txn, account)
+        amount = float(txn["amount"])
+        for field in self.fields:
+            key = (account, field, txn.get(field))
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = RunningStats()
+            stats.update(amount, self.decay)
+        flagged = [f for f, z in scores.items() if z is not None and abs(z) > self.z_thresh]
+        return {"scores": scores, "anomalous": bool(flagged), "flagged_by": flagged}
+
+    @classmethod
+    def from_transactions(cls, transactions: pd.DataFrame, account=None, **kwargs) -> "StreamingAnomalyDetector":
+        """
+        Warm-start from a history table with one grouped pass per field (exact
+        for decay=1.0; with decay the history is treated as equally weighted).
+        """
+        detector = cls(**kwargs)
+        for field in detector.fields:
+            grouped = transactions.groupby(field, observed=True)["amount"]
+            agg = pd.DataFrame({"n": grouped.size(), "mean": grouped.mean(), "var": grouped.var(ddof=0)})
+            for value, row in agg.iterrows():
+                detector._stats[(account, field, value)] = RunningStats(
+                    float(row["n"]), float(row["mean"]), float(row["var"] * row["n"])
+                )
+        return detector
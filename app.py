@@ -3,17 +3,71 @@
 Streamlit Web Interface for the Multi-Agent AI Financial Planner
 ✅ Combines manual sidebar navigation + natural language query mode
 ✅ Uses same architecture and agents from the CLI version (main.py)
+✅ Data, router and agents are cached per (user, data version), so widget
+   reruns only recompute what the widget changed (e.g. the forecast)
 """
 
 import streamlit as st
 import pandas as pd
 from utils.data_generator import generate_transactions
 from router_agent import RouterAgent
+from utils.query_params import extract_params
 import os
 
 # --- PAGE CONFIG ---
 st.set_page_config(page_title="AI Financial Planner", layout="wide", page_icon="💰")
 
+# --- CACHED DATA / RESOURCES ---
+# Every entry is keyed on (username, data_version); "Login / Reset" bumps the
+# version, which is the only thing that regenerates data or rebuilds agents.
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_transactions(username: str, data_version: int, n: int = 300):
+    return generate_transactions(n)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def get_router(username: str, data_version: int, balance: float):
+    return RouterAgent(load_transactions(username, data_version), user_balance=balance, session_id=username)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def get_spending_advisor(username: str, data_version: int, balance: float):
+    from spending_advisor import SpendingAdvisor
+    return SpendingAdvisor(get_router(username, data_version, balance).store)  # shared typed store, no copy
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def get_purchase_planner(username: str, data_version: int, balance: float):
+    from purchase_planner import PurchasePlanner
+    return PurchasePlanner(get_router(username, data_version, balance).store, current_balance=balance)
+
+@st.cache_resource(max_entries=64, show_spinner=False)
+def get_trip_planner(balance: float):
+    from trip_planner import TripPlanner
+    return TripPlanner(balance)
+
+def windowed_advisor(username: str, data_version: int, balance: float, start=None, end=None):
+    agent = get_spending_advisor(username, data_version, balance)
+    if start is not None or end is not None:
+        from spending_advisor import SpendingAdvisor
+        agent = SpendingAdvisor(agent.store, start, end)  # window served from the store's time index
+    return agent
+
+def spending_visuals(username: str, data_version: int, balance: float, start=None, end=None):
+    # not cached: content-addressed charts are reused from disk, and re-drawn if pruned
+    agent = windowed_advisor(username, data_version, balance, start, end)
+    return agent.generate_visuals(get_router(username, data_version, balance).output_dir())
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def spending_analysis(username: str, data_version: int, balance: float, start=None, end=None):
+    agent = windowed_advisor(username, data_version, balance, start, end)
+    return {
+        "summary": agent.summary(),
+        "unusual": agent.unusual_spending(),
+        "visuals": spending_visuals(username, data_version, balance, start, end)
+    }
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def purchase_forecast(username: str, data_version: int, balance: float, target: float, months: int):
+    return get_purchase_planner(username, data_version, balance).forecast_required_savings(target, months)
+
 # --- SIMULATED LOGIN ---
 st.sidebar.header("🔐 Simulated Login")
 username = st.sidebar.text_input("Enter username", "demo_user")
@@ -21,16 +75,14 @@ login_btn = st.sidebar.button("Login / Reset Session")
 
 if login_btn or "user" not in st.session_state:
     st.session_state["user"] = {"username": username, "balance": 2500.00}
-    st.session_state["transactions"] = generate_transactions(300)
-    st.session_state["router"] = RouterAgent(
-        st.session_state["transactions"],
-        user_balance=st.session_state["user"]["balance"]
-    )
+    st.session_state["data_version"] = st.session_state.get("data_version", -1) + 1
     st.success(f"Logged in as {username} (Simulated)")
     st.rerun()
 
 user = st.session_state["user"]
-router = st.session_state["router"]
+cache_key = (user["username"], st.session_state["data_version"], user["balance"])
+router = get_router(*cache_key)
+st.session_state["router"] = router
 
 # --- SIDEBAR NAVIGATION ---
 st.sidebar.header("🧭 Navigation")
@@ -54,24 +106,7 @@ if mode == "💬 Natural Query Mode":
     run_btn = st.button("Run Query 🚀")
 
     if run_btn and query.strip():
-        kwargs = {}
-        q_lower = query.lower()
-        import re
-        if any(word in q_lower for word in ["buy", "purchase", "car", "save"]):
-            m = re.search(r"\$?(\d{3,}(?:\.\d{1,2})?)", q_lower.replace(",", ""))
-            if m:
-                kwargs["target_amount"] = float(m.group(1))
-            m2 = re.search(r"(\d+)\s*(months|month|m)", q_lower)
-            if m2:
-                kwargs["months"] = int(m2.group(1))
-        if "trip" in q_lower or "nyc" in q_lower:
-            m = re.search(r"\$?(\d{2,5})", q_lower.replace(",", ""))
-            if m:
-                kwargs["budget"] = float(m.group(1))
-            m2 = re.search(r"(\d+)\s*(day|days)", q_lower)
-            if m2:
-                kwargs["days"] = int(m2.group(1))
-            kwargs["destination"] = "NYC" if "nyc" in q_lower else "Unknown"
+        kwargs = extract_params(query)
 
         with st.spinner("Analyzing query using RouterAgent..."):
             response = router.handle(query, **kwargs)
@@ -89,7 +124,8 @@ if mode == "💬 Natural Query Mode":
         elif response["intent"] == "purchase":
             plan = response["plan"]
             st.metric("Monthly Needed", f"${plan['monthly_needed']}")
-            st.metric("Predicted Next Month Saving", f"${plan['predicted_next_month_saving']}")
+            if "predicted_next_month_saving" in plan:  # absent when too little history to fit a trend
+                st.metric("Predicted Next Month Saving", f"${plan['predicted_next_month_saving']}")
         elif response["intent"] == "trip":
             plan = response["plan"]
             st.markdown(f"### ✈️ Trip Plan for {plan['destination']}")
@@ -101,18 +137,19 @@ elif mode == "📊 Spending Advisor":
     st.header("📊 Daily Spending Advisor")
     st.write("Analyze your spending habits and visualize expense patterns.")
 
-    advisor = router  # Router contains transactions
-    df = st.session_state["transactions"]
-    from spending_advisor import SpendingAdvisor
-    agent = SpendingAdvisor(df)
-
+    frame = get_router(*cache_key).store.frame
+    first, last = frame["date"].min().date(), frame["date"].max().date()
+    window = st.date_input("Date range", (first, last), min_value=first, max_value=last)
     if st.button("Run Spending Analysis"):
         st.success("Running analysis...")
-        result = {
-            "summary": agent.summary(),
-            "unusual": agent.unusual_spending(),
-            "visuals": agent.generate_visuals("./outputs")
-        }
+        start, end = None, None
+        if len(window) == 2 and tuple(window) != (first, last):
+            # date_input is inclusive; windows are [start, end)
+            start, end = window[0].isoformat(), (window[1] + pd.Timedelta(days=1)).isoformat()
+        result = spending_analysis(*cache_key, start, end)
+        if not all(os.path.exists(path) for path in result["visuals"].values()):
+            # the cached result outlived its charts (see CHART_KEEP in utils.visualizer)
+            result = {**result, "visuals": spending_visuals(*cache_key, start, end)}
         st.json(result)
         for name, path in result["visuals"].items():
             if os.path.exists(path):
@@ -121,23 +158,29 @@ elif mode == "📊 Spending Advisor":
 elif mode == "🚗 Purchase Planner":
     st.header("🚗 Big Purchase Planner")
     st.write("Forecast savings and plan for major purchases.")
-    from purchase_planner import PurchasePlanner
-    df = st.session_state["transactions"]
-    agent = PurchasePlanner(df, current_balance=user["balance"])
-
     target = st.number_input("Target Purchase Amount ($):", 1000, 100000, 30000, step=1000)
     months = st.slider("Months to achieve goal:", 1, 36, 12)
     if st.button("Generate Plan"):
-        plan = agent.forecast_required_savings(target, months)
+        # only the forecast depends on the widgets; data and planner come from cache
+        plan = purchase_forecast(*cache_key, target, months)
         st.json(plan)
         st.metric("Monthly Needed", f"${plan['monthly_needed']}")
-        st.metric("Predicted Next Month Saving", f"${plan['predicted_next_month_saving']}")
+        if "predicted_next_month_saving" in plan:  # absent when too little history to fit a trend
+            st.metric("Predicted Next Month Saving", f"${plan['predicted_next_month_saving']}")
+
+    with st.expander("📋 What-if table (monthly saving needed)"):
+        targets = [target * f for f in (0.5, 0.75, 1.0, 1.25, 1.5)]
+        horizons = [6, 12, 18, 24, 36]
+        grid = get_purchase_planner(*cache_key).scenario_grid(targets, horizons)
+        table = pd.DataFrame(grid["monthly_needed"][0].round(2),
+                             index=[f"${t:,.0f}" for t in targets],
+                             columns=[f"{h} months" for h in horizons])
+        st.dataframe(table)
 
 elif mode == "✈️ Trip Planner":
     st.header("✈️ Trip Planning Assistant")
     st.write("Plan optimized trips based on your current balance and budget.")
-    from trip_planner import TripPlanner
-    agent = TripPlanner(user["balance"])
+    agent = get_trip_planner(user["balance"])
 
     destination = st.text_input("Destination", "New York City")
     days = st.slider("Trip Duration (Days):", 1, 14, 4)
@@ -146,7 +189,16 @@ elif mode == "✈️ Trip Planner":
         plan = agent.simulate_travel_options(destination, days, budget)
         st.json(plan)
         st.success("✅ Trip Feasible" if plan["feasible"] else "⚠️ Not Feasible")
+        risk = agent.simulate_cost_distribution(destination, days, budget)
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Median Cost", f"${risk['cost_percentiles']['p50']}")
+        col2.metric("P(within budget)", f"{risk['prob_within_budget']:.0%}")
+        col3.metric("P(within balance)", f"{risk['prob_within_balance']:.0%}")
 
 # --- SESSION HISTORY ---
+# only the most recent entries are rendered; the full log stays on disk
+HISTORY_SHOWN = 20
 with st.expander("🧩 View Router Session History"):
-    st.write(router.session)
+    history = router.session["history"]
+    st.caption(f"Session `{router.session['id']}`: {history.total} queries, showing the last {HISTORY_SHOWN}")
+    st.write(history.recent(HISTORY_SHOWN)[::-1])
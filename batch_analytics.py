@@ -0,0 +1,117 @@
+"""
+Fleet-wide batch analytics (nightly jobs over many accounts):
+- Takes one large transactions table with a `user_id` column instead of one
+  DataFrame per user.
+- Computes what SpendingAdvisor / PurchasePlanner compute per user (top
+  category totals, z-score outlier categories, monthly savings trend) in
+  grouped, vectorized passes rather than a Python loop over user objects.
+- `run_batch` can split users into hash shards and process shards in parallel
+  worker processes.
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from utils.transaction_store import to_typed_frame
+
+
+def prepare(transactions: pd.DataFrame) -> pd.DataFrame:
+    """Typed transaction schema plus a categorical user_id column."""
+    if "user_id" not in transactions.columns:
+        raise ValueError("batch analytics needs a 'user_id' column")
+    df = to_typed_frame(transactions)
+    df.insert(0, "user_id", pd.Categorical(transactions["user_id"].to_numpy()))
+    return df
+
+
+def _category_totals(df: pd.DataFrame) -> pd.DataFrame:
+    totals = df.groupby(["user_id", "category"], observed=True)["amount"].sum().abs()
+    return totals.rename("total").reset_index()
+
+
+def category_summary(df: pd.DataFrame, top_n: int = 5) -> pd.DataFrame:
+    """Top-N categories by absolute total per user (SpendingAdvisor.summary for everyone)."""
+    totals = _category_totals(df).sort_values(["user_id", "total"], ascending=[True, False])
+    return totals.groupby("user_id", observed=True).head(top_n).reset_index(drop=True)
+
+
+def category_outliers(df: pd.DataFrame, z_thresh: float = 2.0) -> pd.DataFrame:
+    """
+    Per-user z-scores of absolute category totals (population std, like
+    scipy.stats.zscore); returns the rows with |z| > z_thresh.
+    """
+    totals = _category_totals(df)
+    by_user = totals.groupby("user_id", observed=True)["total"]
+    mean = by_user.transform("mean")
+    std = by_user.transform("std", ddof=0)
+    totals["z"] = (totals["total"] - mean) / std.replace(0.0, np.nan)
+    flagged = (by_user.transform("size") >= 2) & (totals["z"].abs() > z_thresh)
+    return totals[flagged].reset_index(drop=True)
+
+
+def savings_trends(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per-user least-squares line through monthly savings (PurchasePlanner's
+    trend), from grouped sums instead of one regression per user.
+    """
+    month = df["date"].dt.to_period("M").rename("month")
+    monthly = (-df["amount"]).groupby([df["user_id"], month], observed=True).sum()
+    monthly = monthly.rename("saving").reset_index().sort_values(["user_id", "month"])
+    monthly["x"] = monthly.groupby("user_id", observed=True).cumcount().astype(float)
+    monthly["xy"] = monthly["x"] * monthly["saving"]
+    monthly["xx"] = monthly["x"] ** 2
+    sums = monthly.groupby("user_id", observed=True).agg(
+        n_months=("x", "size"), sx=("x", "sum"), sy=("saving", "sum"), sxy=("xy", "sum"), sxx=("xx", "sum"),
+    )
+    n = sums["n_months"].astype(float)
+    denom = n * sums["sxx"] - sums["sx"] ** 2
+    slope = (n * sums["sxy"] - sums["sx"] * sums["sy"]) / denom.where(denom != 0)
+    intercept = (sums["sy"] - slope * sums["sx"]) / n
+    return pd.DataFrame({
+        "n_months": sums["n_months"],
+        "model_coef": slope,
+        "intercept": intercept,
+        "predicted_next_month_saving": intercept + slope * n,
+    }).reset_index()
+
+
+def analyze(df: pd.DataFrame, top_n: int = 5, z_thresh: float = 2.0) -> dict:
+    """All three reports for an already prepared frame."""
+    return {
+        "summary": category_summary(df, top_n),
+        "outliers": category_outliers(df, z_thresh),
+        "trends": savings_trends(df),
+    }
+
+
+def shard_users(df: pd.DataFrame, shards: int) -> list:
+    """Split rows into `shards` frames by a stable hash of user_id (a user never spans shards)."""
+    users = df["user_id"].cat
+    # hash each distinct user once, then broadcast to rows through the category codes
+    shard_of_user = pd.util.hash_array(users.categories.astype(str).to_numpy()) % shards
+    shard = shard_of_user[users.codes.to_numpy()]
+    return [df[shard == i] for i in range(shards)]
+
+
+def _analyze_shard(args):
+    df, top_n, z_thresh = args
+    df = df.assign(user_id=df["user_id"].cat.remove_unused_categories())
+    return analyze(df, top_n, z_thresh)
+
+
+def run_batch(transactions: pd.DataFrame, shards: int = 1, processes: int = None,
+              top_n: int = 5, z_thresh: float = 2.0) -> dict:
+    """
+    Summary, outliers and savings trends for every user in `transactions`.
+    With shards > 1 the users are hash-partitioned; with processes > 1 the
+    shards run in a process pool.
+    """
+    df = prepare(transactions)
+    if shards <= 1:
+        return analyze(df, top_n, z_thresh)
+    jobs = [(part, top_n, z_thresh) for part in shard_users(df, shards)]
+    if processes and processes > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            results = list(pool.map(_analyze_shard, jobs))
+    else:
+        results = [_analyze_shard(job) for job in jobs]
+    return {key: pd.concat([r[key] for r in results], ignore_index=True) for key in results[0]}
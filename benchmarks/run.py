@@ -0,0 +1,288 @@
+"""
+Benchmark harness for the agents, router and ingestion loaders.
+- Every benchmark is run at each data size (1k .. 10M transactions) on seeded
+  data, so runs are comparable across commits.
+- Reports best-of-N wall time, plus peak Python heap (tracemalloc) from one
+  separate traced run so tracing does not skew the timings.
+- Results are written as JSON; `--baseline` compares against a stored run and
+  exits non-zero when a benchmark regresses by more than `--threshold`.
+- Gemini is stubbed, so router numbers measure our own code, not the network.
+
+Usage (from the repo root):
+    python -m benchmarks.run --sizes 1k,100k,1m
+    python -m benchmarks.run --baseline benchmarks/baseline.json --threshold 0.2
+    python -m benchmarks.run --only advisor. --sizes 10m --repeat 1
+"""
+import argparse
+import datetime
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+SEED = 42
+WARMUP_SIZE = 1_000  # one untimed run per benchmark pays for imports / font caches
+DEFAULT_SIZES = "1k,10k,100k"
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+PDF_MAX_PAGES = 500  # PDF pages scale with size (1 per 1k transactions) up to this cap
+_SUFFIXES = {"k": 1_000, "m": 1_000_000}
+
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower().replace("_", "")
+    if text and text[-1] in _SUFFIXES:
+        return int(float(text[:-1]) * _SUFFIXES[text[-1]])
+    return int(text)
+
+
+def _stub_gemini():
+    """Answer every LLM call locally; the label is taken from the keyword matcher."""
+    from utils import gemini_client
+    from router_agent import keyword_fallback
+
+    def call_gemini(prompt, max_tokens=64, model=None):
+        return keyword_fallback(prompt.rsplit("Query:", 1)[-1])
+    gemini_client.call_gemini = call_gemini
+
+
+# --- benchmarks -------------------------------------------------------------
+# Each entry maps a name to setup(size, tmp) -> zero-arg callable. setup runs
+# outside the timed region, once per repeat, so every repeat starts cold.
+
+def _transactions(size):
+    from utils.data_generator import generate_transactions
+    return generate_transactions(size, start_date="2025-01-01", seed=SEED)
+
+
+def _advisor(size):
+    from spending_advisor import SpendingAdvisor
+    return SpendingAdvisor(_transactions(size))
+
+
+def bench_generate(size, tmp):
+    from utils.data_generator import generate_transactions
+    return lambda: generate_transactions(size, start_date="2025-01-01", seed=SEED)
+
+
+def bench_advisor_summary(size, tmp):
+    return _advisor(size).summary
+
+
+def bench_advisor_unusual(size, tmp):
+    return _advisor(size).unusual_spending
+
+
+def bench_advisor_visuals(size, tmp):
+    advisor = _advisor(size)
+    out_dir = tempfile.mkdtemp(dir=tmp)  # empty dir, so charts are really rendered
+    return lambda: advisor.generate_visuals(out_dir)
+
+
+def bench_forecast(size, tmp):
+    from purchase_planner import PurchasePlanner
+    planner = PurchasePlanner(_transactions(size), current_balance=2500.0)
+    return lambda: planner.forecast_required_savings(30000, 12)
+
+
+def bench_router_handle(size, tmp):
+    from router_agent import RouterAgent
+    from utils.intent_cache import IntentCache
+    router = RouterAgent(_transactions(size), user_balance=2500.0, intent_cache=IntentCache())
+    queries = [
+        ("How much did I spend on groceries?", {}),
+        ("Can I buy a $30000 car in 12 months?", {"target_amount": 30000.0, "months": 12}),
+        ("Plan a 4-day NYC trip with a $2000 budget", {"destination": "NYC", "days": 4, "budget": 2000.0}),
+        ("what about my money", {}),  # no confident keyword match -> stubbed LLM
+    ]
+    out_dir = tempfile.mkdtemp(dir=tmp)
+
+    def run():
+        for query, kwargs in queries:
+            router.handle(query, out_dir=out_dir, **kwargs)
+    return run
+
+
+def _csv(size, tmp):
+    from utils.data_generator import write_transactions_csv
+    path = os.path.join(tmp, f"transactions_{size}.csv")
+    if not os.path.exists(path):
+        write_transactions_csv(path, size, start_date="2025-01-01", seed=SEED)
+    return path
+
+
+def bench_ingest_csv_raw(size, tmp):
+    from ingestion import load_csv_transactions
+    path = _csv(size, tmp)
+    return lambda: load_csv_transactions(path)
+
+
+def bench_ingest_csv_parse(size, tmp):
+    from ingestion import load_transactions_csv
+    path = _csv(size, tmp)
+    return lambda: load_transactions_csv(path, cache_dir=None)
+
+
+def bench_ingest_csv_cached(size, tmp):
+    from ingestion import load_transactions_csv
+    path = _csv(size, tmp)
+    cache_dir = os.path.join(tmp, "transaction_cache")
+    load_transactions_csv(path, cache_dir=cache_dir)  # warm the columnar cache
+    return lambda: len(load_transactions_csv(path, cache_dir=cache_dir).frame)
+
+
+def bench_ingest_pdf(size, tmp):
+    import fitz
+    from ingestion import load_pdf
+    pages = max(1, min(size // 1000, PDF_MAX_PAGES))
+    path = os.path.join(tmp, f"statement_{pages}.pdf")
+    if not os.path.exists(path):
+        doc = fitz.open()
+        for i in range(pages):
+            doc.new_page().insert_text((72, 72), f"Statement page {i}\n" + "2025-01-01 Grocery -42.10\n" * 40)
+        doc.save(path)
+        doc.close()
+    return lambda: load_pdf(path, cache_dir=None)
+
+
+BENCHMARKS = {
+    "data.generate_transactions": bench_generate,
+    "advisor.summary": bench_advisor_summary,
+    "advisor.unusual_spending": bench_advisor_unusual,
+    "advisor.generate_visuals": bench_advisor_visuals,
+    "planner.forecast_required_savings": bench_forecast,
+    "router.handle": bench_router_handle,
+    "ingestion.load_csv_transactions": bench_ingest_csv_raw,
+    "ingestion.load_transactions_csv": bench_ingest_csv_parse,
+    "ingestion.load_transactions_csv_cached": bench_ingest_csv_cached,
+    "ingestion.load_pdf": bench_ingest_pdf,
+}
+
+
+# --- runner -----------------------------------------------------------------
+
+def measure(setup, size: int, tmp: str, repeat: int) -> dict:
+    times = []
+    for _ in range(repeat):
+        fn = setup(size, tmp)
+        gc.collect()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        del fn
+
+    fn = setup(size, tmp)
+    gc.collect()
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "wall_s": min(times),
+        "wall_s_median": float(np.median(times)),
+        "peak_mb": peak / 2**20,
+        "repeat": repeat,
+    }
+
+
+def run(names, sizes, repeat: int = 3, log=print) -> dict:
+    _stub_gemini()
+    results = []
+    tmp = tempfile.mkdtemp(prefix="bench_")
+    try:
+        for name in names:
+            BENCHMARKS[name](WARMUP_SIZE, tmp)()
+        for size in sizes:
+            for name in names:
+                stats = measure(BENCHMARKS[name], size, tmp, repeat)
+                results.append({"name": name, "size": size, **stats})
+                log(f"{name:<42} {size:>10,}  {stats['wall_s'] * 1000:10.1f} ms  {stats['peak_mb']:9.1f} MB")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2) -> list:
+    """
+    Rows (name, size, metric, baseline, current, ratio) where current exceeds
+    baseline by more than `threshold` (0.2 = 20% slower / larger).
+    """
+    base = {(r["name"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["name"], r["size"]))
+        if b is None:
+            continue
+        for metric in ("wall_s", "peak_mb"):
+            if b[metric] > 0 and r[metric] > b[metric] * (1 + threshold):
+                regressions.append((r["name"], r["size"], metric, b[metric], r[metric], r[metric] / b[metric]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark agents, router and ingestion")
+    parser.add_argument("--sizes", default=DEFAULT_SIZES, help="comma-separated sizes, e.g. 1k,100k,10m")
+    parser.add_argument("--only", default="", help="comma-separated name prefixes to run")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per benchmark (best is reported)")
+    parser.add_argument("--output", default=None, help="results JSON path (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown / growth vs baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="write this run to --baseline")
+    parser.add_argument("--list", action="store_true", help="list benchmark names and exit")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        print("\n".join(BENCHMARKS))
+        return 0
+    prefixes = [p for p in args.only.split(",") if p]
+    names = [n for n in BENCHMARKS if not prefixes or any(n.startswith(p) for p in prefixes)]
+    if not names:
+        parser.error(f"no benchmark matches --only {args.only!r}")
+    sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+
+    report = run(names, sizes, args.repeat)
+
+    output = args.output or os.path.join(RESULTS_DIR, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {output}")
+
+    if not args.baseline:
+        return 0
+    if args.update_baseline or not os.path.exists(args.baseline):
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    for name, size, metric, before, after, ratio in regressions:
+        print(f"REGRESSION {name} @ {size:,}: {metric} {before:.4g} -> {after:.4g} ({ratio:.2f}x)")
+    if not regressions:
+        print(f"No regressions beyond {args.threshold:.0%} vs {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
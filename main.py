@@ -3,11 +3,21 @@
 CLI entrypoint that ties everything together.
 Follows the PDF: command-line interface with simulated user authentication and
 routing to three agents via the RouterAgent.
+Heavy modules are imported after the login line (see utils.lazy_imports);
+`--startup-report` prints what each import cost; `--latency-report` prints
+per-stage latency histograms (utils.tracing) on exit.
+`--queries FILE` (or `-` for stdin) answers one query per line without
+prompting and writes one JSON response per line; `--workers N` serves them from
+a thread pool that shares the session's single transaction store.
 """
+import time
+_T0 = time.perf_counter()
+
 import argparse
-import pandas as pd
-from utils.data_generator import generate_transactions
-from router_agent import RouterAgent
+import json
+import sys
+from itertools import islice
+from utils.lazy_imports import STARTUP_BUDGET_MS, import_report, lazy_import, within_budget
 from rich import print as rprint
 from rich.prompt import Prompt
 
@@ -15,46 +25,125 @@ def simulate_login(username: str):
     # Simulated login as allowed by the assignment
     return {"username": username, "user_id": f"user_{username}", "balance": 2500.00}
 
+def print_import_report(title: str, log=rprint):
+    log(f"[bold magenta]{title}[/bold magenta]")
+    for name, ms in import_report():
+        log(f"  {name:<28} {ms:8.1f} ms")
+
+def print_latency_report(fmt: str, file=None):
+    exporter = lazy_import("utils.tracing").exporter
+    print(exporter.to_json(indent=2) if fmt == "json" else exporter.to_prometheus(), file=file)
+
+def _read_queries(lines):
+    """
+    (query, kwargs, error) per non-blank line: plain text, or a JSON line
+    {"query": ..., **kwargs} with explicit parameters. A malformed JSON line
+    comes back as (line, None, error) so the batch can report it and go on.
+    """
+    from utils.query_params import extract_params
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith("{"):
+            try:
+                item = json.loads(line)
+                query = item.pop("query")
+                if not isinstance(query, str):
+                    raise TypeError("'query' must be a string")
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                yield line, None, f"malformed query line: {type(exc).__name__}: {exc}"
+                continue
+            yield query, {**extract_params(query), **item}, None
+        else:
+            yield line, extract_params(line), None
+
+def _handle_one(router, query: str, kwargs: dict) -> dict:
+    # same per-item error shape as RouterAgent.handle_many
+    try:
+        return router.handle(query, **kwargs)
+    except Exception as exc:
+        return {"intent": router.session["history"][-1]["intent"], "error": f"{type(exc).__name__}: {exc}"}
+
+def run_batch(router, lines, out, workers: int = 1, batch_size: int = 256):
+    """Answer queries from `lines`, writing one JSON line per query to `out` in input order."""
+    import asyncio
+    from concurrent.futures import ThreadPoolExecutor
+    from router_agent import response_json
+    queries = _read_queries(lines)
+    count = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batch = list(islice(queries, batch_size))
+            if not batch:
+                break
+            valid = [(query, kwargs) for query, kwargs, error in batch if error is None]
+            if workers > 1:
+                responses = asyncio.run(router.handle_many(valid, concurrency=workers, executor=pool))
+            else:
+                responses = [_handle_one(router, query, kwargs) for query, kwargs in valid]
+            responses = iter(responses)
+            for query, _, error in batch:
+                record = {"query": query, "error": error} if error else {"query": query, "response": next(responses)}
+                out.write(response_json(record) + "\n")
+            out.flush()
+            count += len(batch)
+    return count
+
 def main():
     parser = argparse.ArgumentParser(description="Multi-Agent AI Financial Planner CLI (assignment)")
     parser.add_argument("--user", type=str, default="demo", help="username (simulated auth)")
+    parser.add_argument("--startup-report", action="store_true", help="print per-module import times")
+    parser.add_argument("--latency-report", choices=["json", "prometheus"], help="print stage latency histograms on exit")
+    parser.add_argument("--queries", type=str, help="batch mode: file with one query per line ('-' for stdin)")
+    parser.add_argument("--output", type=str, default="-", help="batch mode: JSONL output file ('-' for stdout)")
+    parser.add_argument("--workers", type=int, default=1, help="batch mode: concurrent queries")
     args = parser.parse_args()
 
     user = simulate_login(args.user)
-    rprint(f"[bold green]Logged in as:[/bold green] {user['username']} (simulated)")
+    # in batch mode stdout may carry the JSONL responses, so status goes to stderr
+    log = rprint if not args.queries else lambda *a: rprint(*a, file=sys.stderr)
+    log(f"[bold green]Logged in as:[/bold green] {user['username']} (simulated)")
 
     # Create mock transactions as required by the assignment
-    df = generate_transactions(n=300)
-    router = RouterAgent(df, user_balance=user["balance"])
+    df = lazy_import("utils.data_generator").generate_transactions(n=300)
+    router = lazy_import("router_agent").RouterAgent(df, user_balance=user["balance"], session_id=user["user_id"])
+
+    if args.startup_report:
+        startup_ms = (time.perf_counter() - _T0) * 1000
+        status = "[green]within[/green]" if within_budget(startup_ms) else "[red]over[/red]"
+        log(f"Startup: {startup_ms:.0f} ms ({status} {STARTUP_BUDGET_MS:.0f} ms budget)")
+        print_import_report("Imports so far:", log)
+
+    if args.queries:
+        start = time.perf_counter()
+        src = sys.stdin if args.queries == "-" else open(args.queries, encoding="utf-8")
+        out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+        try:
+            count = run_batch(router, src, out, workers=max(1, args.workers))
+        finally:
+            for f in (src, out):
+                if f not in (sys.stdin, sys.stdout):
+                    f.close()
+            router.session["history"].close()
+        log(f"Answered {count} queries in {time.perf_counter() - start:.2f}s")
+        if args.latency_report:
+            print_latency_report(args.latency_report, sys.stderr)
+        return
 
     while True:
         query = Prompt.ask("\nEnter your question (or 'exit' to quit)")
         if query.strip().lower() in ("exit", "quit"):
+            if args.startup_report:
+                print_import_report("Imports this session (incl. first-use):")
+            if args.latency_report:
+                print_latency_report(args.latency_report)
+            router.session["history"].close()
             rprint("[bold yellow]Goodbye![/bold yellow]")
             break
 
-        # Simple CLI parse to extract optional parameters for purchase/trip
-        # Keep parsing minimal to remain within PDF scope:
-        kwargs = {}
-        if "buy" in query.lower() or "car" in query.lower() or "purchase" in query.lower():
-            # try to find a number in query
-            import re
-            m = re.search(r"\$?(\d{3,}(?:\.\d{1,2})?)", query.replace(",", ""))
-            if m:
-                kwargs["target_amount"] = float(m.group(1))
-            m2 = re.search(r"(\d+)\s*(months|month|m)", query)
-            if m2:
-                kwargs["months"] = int(m2.group(1))
-        if "trip" in query.lower() or "nyc" in query.lower():
-            # basic extraction
-            import re
-            m = re.search(r"\$?(\d{2,5})", query.replace(",", ""))
-            if m:
-                kwargs["budget"] = float(m.group(1))
-            m2 = re.search(r"(\d+)\s*(day|days)", query)
-            if m2:
-                kwargs["days"] = int(m2.group(1))
-            kwargs["destination"] = "NYC" if "nyc" in query.lower() else "Unknown"
+        # optional parameters for purchase/trip (shared with app.py)
+        kwargs = lazy_import("utils.query_params").extract_params(query)
 
         # route the query
         resp = router.handle(query, **kwargs)
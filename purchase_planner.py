@@ -3,53 +3,138 @@
 Big Purchase Planner:
 - Simple linear projection forecasting for savings goal using past monthly savings trend
 - Suggests monthly saving needed to reach target in desired months
+- The trend is a closed-form least-squares fit (SavingsTrend), computed once per
+  data version and reused for whole what-if grids of targets x horizons x balances
+- `start` / `end` fit the trend on a date window [start, end) only (via the
+  store's time index)
 """
-import pandas as pd
 import numpy as np
-from sklearn.linear_model import LinearRegression
 from datetime import datetime
 import calendar
+from utils.tracing import span
+from utils.transaction_store import as_store
+
+
+class SavingsTrend:
+    """
+    Straight line through monthly savings: saving(i) = intercept + slope * i,
+    where i = 0..n_months-1 indexes the observed months in order.
+    """
+
+    def __init__(self, slope: float, intercept: float, n_months: int):
+        self.slope = slope
+        self.intercept = intercept
+        self.n_months = n_months
+
+    @classmethod
+    def fit(cls, savings) -> "SavingsTrend":
+        """Ordinary least squares in closed form (same result as sklearn LinearRegression)."""
+        y = np.asarray(savings, dtype=float)
+        x = np.arange(len(y), dtype=float)
+        dx = x - x.mean()
+        denom = float(dx @ dx)
+        slope = float(dx @ (y - y.mean())) / denom if denom else 0.0
+        return cls(slope, float(y.mean() - slope * x.mean()), len(y))
+
+    def predict(self, month_index):
+        return self.intercept + self.slope * np.asarray(month_index, dtype=float)
+
+    def project_grid(self, targets, horizons, balances) -> dict:
+        """
+        Evaluate every (balance, target, horizon) scenario in one vectorized pass.
+        Returns arrays indexed [balance, target(, horizon)]:
+        - months: 1..max(horizons)
+        - projected_saving[k]: trend saving in future month k
+        - projected_balance[b, k]: balance b plus cumulative trend savings
+        - month_reached[b, t]: first month the trend reaches target t
+          (0 if already there, -1 if not within max(horizons))
+        - monthly_needed[b, t, h]: flat saving needed to hit t within horizon h
+        - on_track[b, t, h]: whether the trend alone gets there within h
+        """
+        targets = np.atleast_1d(np.asarray(targets, dtype=float))
+        horizons = np.atleast_1d(np.asarray(horizons, dtype=int))
+        balances = np.atleast_1d(np.asarray(balances, dtype=float))
+        if horizons.min() < 1:
+            raise ValueError("horizons must be >= 1 month")
+        months = np.arange(1, horizons.max() + 1)
+        saving = self.predict(self.n_months - 1 + months)
+        path = balances[:, None] + np.cumsum(saving)[None, :]
+        # column 0 is "now", so an already-met target is reached at month 0
+        path = np.concatenate([balances[:, None], path], axis=1)
+        hit = path[:, None, :] >= targets[None, :, None]
+        month_reached = np.where(hit.any(axis=2), hit.argmax(axis=2), -1)
+        remaining = np.maximum(0.0, targets[None, :] - balances[:, None])
+        monthly_needed = remaining[:, :, None] / horizons[None, None, :]
+        on_track = (month_reached[:, :, None] >= 0) & (month_reached[:, :, None] <= horizons[None, None, :])
+        return {
+            "months": months,
+            "projected_saving": saving,
+            "projected_balance": path[:, 1:],
+            "month_reached": month_reached,
+            "monthly_needed": monthly_needed,
+            "on_track": on_track,
+        }
 
 class PurchasePlanner:
-    def __init__(self, transactions: pd.DataFrame, current_balance: float = 0.0):
-        self.transactions = transactions.copy()
+    def __init__(self, transactions, current_balance: float = 0.0, start=None, end=None):
+        # accepts a shared TransactionStore or a raw DataFrame
+        self.store = as_store(transactions)
+        if start is not None or end is not None:
+            self.store = self.store.window(start, end)
         self.current_balance = current_balance
+        self._trend = None  # (store version, SavingsTrend)
+
+    @property
+    def transactions(self):
+        # typed rows, materialized only when a caller actually needs them
+        return self.store.frame
 
     def monthly_savings_series(self):
-        df = self.transactions.copy()
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.to_period("M")
+        # monthly net comes from the store's rollups; no groupby over the rows
         # define savings as negative amounts (income credits) minus spending (positive)
-        monthly_net = df.groupby("month")["amount"].sum()
+        monthly_net = self.store.rollups.monthly_totals()
         # treat negative as net positive savings when incomes dominate
         return monthly_net.rename_axis("month").reset_index()
 
+    def savings_trend(self):
+        """Linear trend of monthly savings; fitted once per store version. None if < 2 months."""
+        if self._trend is None or self._trend[0] != self.store.version:
+            series = self.monthly_savings_series().sort_values("month")
+            y = -series["amount"].values  # invert sign: positive is savings
+            with span("purchase.fit"):
+                self._trend = (self.store.version, SavingsTrend.fit(y) if len(y) >= 2 else None)
+        return self._trend[1]
+
     def forecast_required_savings(self, target_amount: float, months: int = 12):
         """
         Compute required monthly saving to reach target from current_balance in 'months'.
         Also uses a linear model on past monthly net to show projection (simple).
         """
-        series = self.monthly_savings_series()
-        if series.shape[0] < 2:
+        trend = self.savings_trend()
+        if trend is None:
             # fallback simple division
             needed = max(0.0, (target_amount - self.current_balance) / months)
             return {"monthly_needed": float(round(needed,2)), "method": "simple_division"}
 
-        # prepare data for regression
-        series = series.sort_values("month")
-        # x as integer index
-        x = np.arange(len(series)).reshape(-1,1)
-        y = -series["amount"].values  # invert sign: positive is savings
-        model = LinearRegression().fit(x, y)
         # predicted monthly saving next month
-        next_idx = np.array([[len(series)]])
-        predicted_next = float(model.predict(next_idx)[0])
+        predicted_next = float(trend.predict(trend.n_months))
         # required monthly to hit target
         remaining = max(0.0, target_amount - self.current_balance)
         monthly_needed = remaining / months
         return {
             "monthly_needed": float(round(monthly_needed,2)),
             "predicted_next_month_saving": float(round(predicted_next,2)),
-            "model_coef": float(model.coef_[0]),
+            "model_coef": float(trend.slope),
             "method": "linear_regression_on_monthly_net"
         }
+
+    def scenario_grid(self, targets, horizons, balances=None):
+        """
+        What-if table: every combination of targets x horizons (months) x
+        starting balances (default: current_balance), from a single trend fit.
+        See SavingsTrend.project_grid for the returned arrays.
+        """
+        trend = self.savings_trend() or SavingsTrend(0.0, 0.0, 0)
+        if balances is None:
+            balances = [self.current_balance]
+        return trend.project_grid(targets, horizons, balances)
@@ -4,24 +4,110 @@ Router / Orchestrator:
 - Analyzes the user's plain text query and routes to the correct agent(s).
 - For LLM-based intent classification it uses the gemini client wrapper.
 - Keeps a minimal context (session dict) shared between agents.
+- Intent lookups are cached (utils.intent_cache) and obvious queries are
+  answered by a single-pass keyword matcher without calling the LLM.
+- `ahandle` / `handle_many` serve batches of queries concurrently via asyncio.
+- Every stage runs under a utils.tracing span; each history entry carries the
+  per-query timing breakdown in ms.
+- `session["history"]` is a bounded utils.session_history.SessionHistory,
+  optionally persisted per session under `history_dir` (SESSION_HISTORY_DIR)
+  and shared by every RouterAgent of that session in the process.
+- Agents, the Gemini client and their heavy dependencies (scipy, matplotlib,
+  requests) are imported on first use, not at startup.
 """
-from utils.gemini_client import call_gemini
-from spending_advisor import SpendingAdvisor
-from purchase_planner import PurchasePlanner
-from trip_planner import TripPlanner
-import pandas as pd
+import asyncio
+import json
+import os
+import re
+from collections import Counter
+from concurrent.futures import Executor
+from functools import partial
+from utils.intent_cache import IntentCache, default_intent_cache, normalize_query
+from utils.lazy_imports import lazy_import
+from utils.session_history import default_history_dir, shared_history
+from utils.tracing import collect, span, timed
+from utils.transaction_store import as_store
+
+INTENTS = ("spending", "purchase", "trip", "other")
+_SAFE_ID = re.compile(r"[^\w-]")
+
+# keyword fallback; dict order is the priority used when several intents match
+INTENT_KEYWORDS = {
+    "spending": ["spend", "spending", "spent", "expense", "expenses",
+                 "breakdown", "report", "category", "categories", "analysis"],
+    "purchase": ["buy", "car", "purchase", "save", "saving"],
+    "trip": ["trip", "flight", "hotel", "nyc", "plan"],
+}
+_KEYWORD_INTENT = {w: intent for intent, words in INTENT_KEYWORDS.items() for w in words}
+_ALTERNATION = "|".join(re.escape(w) for w in sorted(_KEYWORD_INTENT, key=len, reverse=True))
+# whole words (plus plural "s") for the local classifier, so "scared" is not "car"
+_KEYWORD_RE = re.compile(rf"\b({_ALTERNATION})s?\b")
+# substring semantics, only for the offline fallback
+_SUBSTRING_RE = re.compile(_ALTERNATION)
+# keyword hits needed before the local classifier is fully confident
+MIN_LOCAL_HITS = 2
+
+
+def match_keywords(query: str):
+    """
+    Return (label, confidence) from a single regex pass over the query.
+    confidence is the share of keyword hits that point at the winning intent,
+    scaled down when it has fewer than MIN_LOCAL_HITS hits, so a single
+    keyword never skips the LLM.
+    """
+    hits = Counter(_KEYWORD_INTENT[m.group(1)] for m in _KEYWORD_RE.finditer(query.lower()))
+    if not hits:
+        return "other", 0.0
+    # highest count wins; ties resolved by INTENT_KEYWORDS priority
+    label = max(INTENT_KEYWORDS, key=lambda intent: (hits[intent], -list(INTENT_KEYWORDS).index(intent)))
+    return label, hits[label] / sum(hits.values()) * min(1.0, hits[label] / MIN_LOCAL_HITS)
+
+
+def keyword_fallback(query: str) -> str:
+    """Offline heuristic: first intent (by priority) with any keyword hit."""
+    hits = {_KEYWORD_INTENT[m.group(0)] for m in _SUBSTRING_RE.finditer(query.lower())}
+    for intent in INTENT_KEYWORDS:
+        if intent in hits:
+            return intent
+    return "other"
+
 
 class RouterAgent:
-    def __init__(self, transactions: pd.DataFrame, user_balance: float = 0.0, session_id: str = "session"):
-        self.transactions = transactions
+    def __init__(self, transactions, user_balance: float = 0.0, session_id: str = "session",
+                 intent_cache: IntentCache = None, local_confidence: float = 0.8, history_dir: str = None):
+        # one typed store per session, shared read-only by every agent
+        self.store = as_store(transactions)
         self.user_balance = user_balance
-        self.session = {"id": session_id, "history": []}
+        # recent entries in memory; full history on disk when a history dir is configured
+        history_dir = history_dir if history_dir is not None else default_history_dir()
+        self.session = {"id": session_id, "history": shared_history(session_id, history_dir)}
+        self.intent_cache = intent_cache if intent_cache is not None else default_intent_cache()
+        # keyword matches at or above this confidence skip the LLM entirely
+        self.local_confidence = local_confidence
+
+    @property
+    def transactions(self):
+        # typed rows, materialized only when a caller actually needs them
+        return self.store.frame
 
     def classify_intent(self, query: str) -> str:
         """
-        Use a brief prompt to Gemini to classify into intent categories:
-        'spending', 'purchase', 'trip', or 'other'.
+        Classify into intent categories: 'spending', 'purchase', 'trip', or 'other'.
+        Order: cache -> confident keyword match -> brief Gemini prompt -> keyword fallback.
         """
+        with span("router.classify"):
+            return self._classify(query)
+
+    def _classify(self, query: str) -> str:
+        key = normalize_query(query)
+        cached = self.intent_cache.get(key)
+        if cached is not None:
+            return cached
+
+        label, confidence = match_keywords(key)
+        if confidence >= self.local_confidence:
+            return label
+
         prompt = f"""
 You are an intent classifier. Classify the user query into one of:
 spending, purchase, trip, other.
@@ -30,50 +116,167 @@ Return only the single word label.
 Query: \"{query}\"
 """
         try:
-            resp = call_gemini(prompt, max_tokens=32)
+            with span("router.classify.llm"):
+                resp = lazy_import("utils.gemini_client").call_gemini(prompt, max_tokens=32)
             if not resp:
                 raise RuntimeError("Empty response from Gemini")
             label = resp.strip().lower().split()[0]
-            if label in ("spending", "purchase", "trip", "other"):
-                return label
-            return "other"
+            if label not in INTENTS:
+                label = "other"
+            self.intent_cache.set(key, label)
+            return label
         except Exception:
-            # fallback heuristic
-            q = query.lower()
-            if any(w in q for w in [
-                "spend", "spending", "spent", "expense", "expenses",
-                "breakdown", "report", "category", "categories", "analysis"
-            ]):
-                return "spending"
-            if any(w in q for w in ["buy", "car", "purchase", "save", "saving"]):
-                return "purchase"
-            if any(w in q for w in ["trip", "flight", "hotel", "nyc", "plan"]):
-                return "trip"
-            return "other"
+            # fallback heuristic (not cached, so the LLM is retried next time)
+            return keyword_fallback(query)
+
+    def _record(self, query: str, label: str, timings: dict = None, error: str = None):
+        entry = {"query": query, "intent": label, "timings_ms": timings or {}}
+        if error is not None:
+            entry["error"] = error
+        self.session["history"].append(entry)
+
+    def output_dir(self, base: str = "./outputs") -> str:
+        """Per-session chart folder, so concurrent sessions never overwrite each other."""
+        return os.path.join(base, _SAFE_ID.sub("_", str(self.session["id"])))
+
+    def _agent_kwargs(self, kwargs: dict) -> dict:
+        return {**kwargs, "out_dir": self.output_dir(kwargs.get("out_dir", "./outputs"))}
 
     def handle(self, query: str, **kwargs):
-        label = self.classify_intent(query)
-        self.session["history"].append({"query": query, "intent": label})
-        if label == "spending":
-            advisor = SpendingAdvisor(self.transactions)
-            return {
-                "intent": "spending",
-                "summary": advisor.summary(),
-                "unusual": advisor.unusual_spending(),
-                "visuals": advisor.generate_visuals(out_dir=kwargs.get("out_dir","./outputs"))
-            }
-        elif label == "purchase":
-            planner = PurchasePlanner(self.transactions, current_balance=self.user_balance)
-            # expecting e.g. "I want to buy a $30000 car in 12 months"
-            # simple parse:
-            target = kwargs.get("target_amount", kwargs.get("amount", 0.0))
-            months = kwargs.get("months", 12)
-            return {"intent": "purchase", "plan": planner.forecast_required_savings(target, months)}
-        elif label == "trip":
-            trip = TripPlanner(self.user_balance)
-            dest = kwargs.get("destination", "Unknown")
-            days = kwargs.get("days", 3)
-            budget = kwargs.get("budget", 1000.0)
-            return {"intent": "trip", "plan": trip.simulate_travel_options(dest, days, budget)}
-        else:
-            return {"intent": "other", "message": "I could not determine the intent precisely."}
+        label = error = None
+        with collect() as timings:
+            try:
+                with span("router.handle"):
+                    label = self.classify_intent(query)
+                    return run_agent(self.store, self.user_balance, label, self._agent_kwargs(kwargs))
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                self._record(query, label, timings, error)
+
+    async def ahandle(self, query: str, executor: Executor = None, **kwargs):
+        """
+        Async version of `handle`. Classification (network bound) runs on the
+        loop's default thread pool; agent work (CPU bound) runs in `executor`
+        (default: the same thread pool).
+        """
+        loop = asyncio.get_running_loop()
+        label = error = None
+        with collect() as timings:
+            try:
+                with span("router.handle"):
+                    label, stages = await loop.run_in_executor(None, timed, self.classify_intent, query)
+                    timings.update(stages)
+                    result, stages = await loop.run_in_executor(
+                        executor, partial(timed, run_agent, self.store, self.user_balance, label, self._agent_kwargs(kwargs))
+                    )
+                    timings.update(stages)
+                    return result
+            except Exception as exc:
+                error = f"{type(exc).__name__}: {exc}"
+                raise
+            finally:
+                self._record(query, label, timings, error)
+
+    async def handle_many(self, queries, concurrency: int = 8, executor: Executor = None):
+        """
+        Handle a batch of queries concurrently; each item is a query string or a
+        (query, kwargs) pair. Intents are classified concurrently on the loop's
+        thread pool, then agents run in `executor`; at most `concurrency` tasks
+        are in flight at once. Results come back in input order and history
+        entries (with per-query stage timings) are appended in input order too.
+        A query that fails does not sink the batch: its slot holds
+        {"intent": label, "error": "..."} and its history entry the same error.
+
+        A ProcessPoolExecutor works as well, but pickles the store into every
+        task; prefer threads (the default) for large transaction tables. Agent
+        spans recorded in worker processes only reach the history entries, not
+        this process's latency histograms.
+        """
+        items = [(q, {}) if isinstance(q, str) else (q[0], dict(q[1])) for q in queries]
+        loop = asyncio.get_running_loop()
+        limit = asyncio.Semaphore(concurrency)
+
+        async def bounded(pool, fn, *args):
+            async with limit:
+                return await loop.run_in_executor(pool, partial(fn, *args))
+
+        async def failed(exc):
+            return exc
+
+        classified = await asyncio.gather(*(bounded(None, timed, self.classify_intent, q) for q, _ in items),
+                                          return_exceptions=True)
+        ran = await asyncio.gather(*(
+            failed(c) if isinstance(c, BaseException) else
+            bounded(executor, timed, run_agent, self.store, self.user_balance, c[0], self._agent_kwargs(kwargs))
+            for (_, kwargs), c in zip(items, classified)
+        ), return_exceptions=True)
+        results = []
+        for (query, _), c, r in zip(items, classified, ran):
+            label, classify_ms = (None, {}) if isinstance(c, BaseException) else c
+            if isinstance(r, BaseException):
+                error = f"{type(r).__name__}: {r}"
+                self._record(query, label, classify_ms, error)
+                results.append({"intent": label, "error": error})
+            else:
+                result, agent_ms = r
+                self._record(query, label, {**classify_ms, **agent_ms})
+                results.append(result)
+        return results
+
+
+def _jsonable(value):
+    # numpy scalars/arrays and timestamps in agent responses
+    if hasattr(value, "tolist"):
+        return value.tolist()
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+
+def response_json(response) -> str:
+    """Serialize an agent response (or anything containing one) to JSON."""
+    return json.dumps(response, default=_jsonable)
+
+
+def run_agent(store, user_balance: float, label: str, kwargs: dict) -> dict:
+    """Run the agent for an already-classified query (module level so process pools can pickle it)."""
+    with span(f"agent.{label}"):
+        return _run_agent(store, user_balance, label, kwargs)
+
+
+def _run_agent(store, user_balance: float, label: str, kwargs: dict) -> dict:
+    if label == "spending":
+        with span("agent.construct"):
+            advisor = lazy_import("spending_advisor").SpendingAdvisor(store, kwargs.get("start"), kwargs.get("end"))
+        result = {
+            "intent": "spending",
+            "summary": advisor.summary(),
+            "unusual": advisor.unusual_spending(),
+            "visuals": advisor.generate_visuals(out_dir=kwargs.get("out_dir","./outputs"),
+                                                resolution=kwargs.get("resolution", "day"))
+        }
+        if "start" in kwargs or "end" in kwargs:
+            result["window"] = {"start": kwargs.get("start"), "end": kwargs.get("end")}
+        return result
+    elif label == "purchase":
+        with span("agent.construct"):
+            # the savings trend always uses full history: a date phrase in a purchase
+            # query ("buy a car this month") is about the goal, not the data to fit
+            planner = lazy_import("purchase_planner").PurchasePlanner(store, current_balance=user_balance)
+        # expecting e.g. "I want to buy a $30000 car in 12 months"
+        # simple parse:
+        target = kwargs.get("target_amount", kwargs.get("amount", 0.0))
+        months = kwargs.get("months", 12)
+        return {"intent": "purchase", "plan": planner.forecast_required_savings(target, months)}
+    elif label == "trip":
+        with span("agent.construct"):
+            trip = lazy_import("trip_planner").TripPlanner(user_balance)
+        dest = kwargs.get("destination", "Unknown")
+        days = kwargs.get("days", 3)
+        budget = kwargs.get("budget", 1000.0)
+        return {"intent": "trip", "plan": trip.simulate_travel_options(dest, days, budget),
+                "risk": trip.simulate_cost_distribution(dest, days, budget)}
+    else:
+        return {"intent": "other", "message": "I could not determine the intent precisely."}
@@ -1,11 +1,13 @@
-
 """
 Minimal Sentry initialization to satisfy the 'Monitoring & Observability' requirement.
 Set SENTRY_DSN environment variable externally if using Sentry.
+Set SENTRY_TRACES_SAMPLE_RATE (e.g. 0.1) to also send utils.tracing spans as
+performance traces.
 """
 import os
 import sentry_sdk
 
 SENTRY_DSN = os.getenv("SENTRY_DSN")
+SENTRY_TRACES_SAMPLE_RATE = float(os.getenv("SENTRY_TRACES_SAMPLE_RATE", "0") or 0)
 if SENTRY_DSN:
-    sentry_sdk.init(dsn=SENTRY_DSN)
+    sentry_sdk.init(dsn=SENTRY_DSN, traces_sample_rate=SENTRY_TRACES_SAMPLE_RATE or None)
@@ -0,0 +1,289 @@
+"""
+Local multi-worker HTTP service for RouterAgent.
+- Each user's transactions live as memory-mapped column files
+  (utils.transaction_store.save_columns) under SERVER_DATA_DIR; worker
+  processes open them with load_columns(mmap=True), so every worker reads the
+  same page-cache pages instead of holding its own copy.
+- The front end is a ThreadingHTTPServer; queries run in a ProcessPoolExecutor
+  whose workers keep one RouterAgent per user, so CPU-bound agent work scales
+  across cores.
+- At most `max_inflight` queries are queued or running at once; beyond that
+  the server answers 503 with Retry-After instead of queueing without bound.
+- If a worker process dies the pool is replaced; the query that was on it
+  gets a 503 and /healthz reports unhealthy until the new pool is in place.
+
+Endpoints:
+    POST /query    {"user": "demo", "query": "...", "balance": 2500, ...params}
+    GET  /healthz  worker/queue status
+    GET  /metrics  request latency histograms (Prometheus text)
+
+Usage:
+    python server.py --users demo,alice --workers 4 --port 8000
+    curl -s localhost:8000/query -d '{"user": "demo", "query": "spending last month"}'
+"""
+import argparse
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils.tracing import exporter, span
+
+SERVER_DATA_DIR = os.getenv("SERVER_DATA_DIR", ".cache/server")
+DEFAULT_BALANCE = 2500.0
+REQUEST_TIMEOUT = 60  # seconds a request may wait for its worker
+MAX_BODY_BYTES = 64 * 1024
+# agent parameters a client may set explicitly (anything else, e.g. out_dir, is ignored)
+QUERY_PARAMS = ("target_amount", "amount", "months", "budget", "days", "destination", "start", "end", "resolution")
+_SAFE_ID = re.compile(r"[^\w-]")
+
+
+def user_dir(data_dir: str, user: str) -> str:
+    return os.path.join(data_dir, _SAFE_ID.sub("_", user))
+
+
+def has_user(data_dir: str, user: str) -> bool:
+    return os.path.exists(os.path.join(user_dir(data_dir, user), "meta.json"))
+
+
+def provision_user(data_dir: str, user: str, transactions) -> str:
+    """Write a user's transactions as column files (atomically replaces any existing set)."""
+    from utils.transaction_store import save_columns, to_typed_frame
+    target = user_dir(data_dir, user)
+    os.makedirs(data_dir, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=data_dir)
+    # date-sorted on disk, so TimeIndex can slice the memory-mapped columns
+    # directly instead of building a private sorted copy in every worker
+    frame = to_typed_frame(transactions)
+    frame = frame.sort_values("date", kind="stable", ignore_index=True)
+    save_columns(frame, tmp)
+    old = None
+    if os.path.exists(target):
+        old = tempfile.mkdtemp(dir=data_dir)
+        os.replace(target, os.path.join(old, "data"))
+    os.replace(tmp, target)
+    if old:
+        shutil.rmtree(old, ignore_errors=True)
+    return target
+
+
+# --- worker process -----------------------------------------------------------
+
+_worker = {"data_dir": None, "routers": {}}
+
+
+def _init_worker(data_dir: str):
+    _worker["data_dir"] = data_dir
+    import router_agent  # noqa: F401  (pay the import once per worker, not on the first query)
+
+
+def _router_for(user: str):
+    from router_agent import RouterAgent
+    from utils.transaction_store import TransactionStore, load_columns
+    directory = user_dir(_worker["data_dir"], user)
+    version = os.stat(os.path.join(directory, "meta.json")).st_mtime_ns  # re-open after re-provisioning
+    cached = _worker["routers"].get(user)
+    if cached is None or cached[0] != version:
+        store = TransactionStore(load_columns(directory, mmap=True))
+        # history stays in memory: several workers serve the same user, and the
+        # on-disk session log expects a single writer
+        router = RouterAgent(store, session_id=user, history_dir="")
+        cached = _worker["routers"][user] = (version, router)
+    return cached[1]
+
+
+def _handle(user: str, balance: float, query: str, kwargs: dict) -> str:
+    from router_agent import response_json
+    router = _router_for(user)
+    # the balance comes with each request; a worker runs one query at a time, so
+    # setting it on the cached router is safe
+    router.user_balance = balance
+    response = router.handle(query, **kwargs)
+    entry = router.session["history"][-1]
+    return response_json({"user": user, "query": query, "response": response,
+                          "timings_ms": entry.get("timings_ms", {}), "worker_pid": os.getpid()})
+
+
+# --- front end ----------------------------------------------------------------
+
+class PlannerServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256  # listen backlog; the default of 5 resets connections under bursts
+
+    def __init__(self, address, data_dir: str = SERVER_DATA_DIR, workers: int = None,
+                 max_inflight: int = 64, timeout: float = REQUEST_TIMEOUT):
+        super().__init__(address, _Handler)
+        self.data_dir = data_dir
+        self.workers = workers or os.cpu_count() or 1
+        self.max_inflight = max_inflight
+        self.timeout_s = timeout
+        self.pool = self._new_pool()
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_inflight)
+        self._lock = threading.Lock()
+        self.inflight = 0
+        self.rejected = 0
+        self.pool_restarts = 0
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.data_dir,))
+
+    @property
+    def pool_broken(self) -> bool:
+        # the executor sets _broken as soon as it notices a worker died; it then
+        # fails every pending and future job with BrokenProcessPool
+        return bool(getattr(self.pool, "_broken", False))
+
+    def recover(self) -> bool:
+        """Replace the pool if it is broken; True when a replacement happened."""
+        with self._pool_lock:
+            if not self.pool_broken:
+                return False
+            broken, self.pool = self.pool, self._new_pool()
+            self.pool_restarts += 1
+        broken.shutdown(wait=False, cancel_futures=True)
+        return True
+
+    def submit(self, fn, *args):
+        """Submit to the worker pool, replacing it first if a dead worker broke it."""
+        with self._pool_lock:
+            pool = self.pool
+        try:
+            return pool.submit(fn, *args)
+        except BrokenProcessPool:
+            self.recover()
+            with self._pool_lock:
+                pool = self.pool
+            return pool.submit(fn, *args)
+
+    def try_acquire(self) -> bool:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.inflight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.inflight -= 1
+        self._slots.release()
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(cancel_futures=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: PlannerServer
+    verbose = False
+
+    def log_message(self, fmt, *args):
+        if self.verbose:
+            super().log_message(fmt, *args)
+
+    def _send(self, status: int, body, content_type: str = "application/json", headers: dict = None):
+        data = (body if isinstance(body, str) else json.dumps(body)).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path == "/healthz":
+            srv = self.server
+            broken = srv.pool_broken
+            if broken:
+                srv.recover()  # so the next probe (and query) sees a working pool
+            self._send(503 if broken else 200, {
+                "status": "unhealthy" if broken else "ok", "workers": srv.workers,
+                "inflight": srv.inflight, "max_inflight": srv.max_inflight, "rejected": srv.rejected,
+                "pool_restarts": srv.pool_restarts})
+        elif self.path == "/metrics":
+            self._send(200, exporter.to_prometheus(), content_type="text/plain; version=0.0.4")
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/query":
+            return self._send(404, {"error": "not found"})
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if length > MAX_BODY_BYTES:
+                return self._send(413, {"error": "request body too large"})
+            body = json.loads(self.rfile.read(length) or b"{}")
+            query = str(body.pop("query"))
+            user = str(body.pop("user", "demo"))
+            balance = float(body.pop("balance", DEFAULT_BALANCE))
+        except (KeyError, ValueError, TypeError, AttributeError):
+            return self._send(400, {"error": "expected a JSON object with a 'query' field"})
+        if not has_user(self.server.data_dir, user):
+            return self._send(404, {"error": f"unknown user {user!r}"})
+
+        # backpressure: refuse instead of queueing without bound
+        if not self.server.try_acquire():
+            return self._send(503, {"error": "server busy, retry later"}, headers={"Retry-After": "1"})
+        try:
+            from utils.query_params import extract_params
+            kwargs = {**extract_params(query), **{k: v for k, v in body.items() if k in QUERY_PARAMS}}
+            future = self.server.submit(_handle, user, balance, query, kwargs)
+        except Exception as exc:
+            self.server.release()  # nothing was queued
+            return self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+        # the slot is held until the job really ends, not just until this request gives up on it
+        future.add_done_callback(lambda _: self.server.release())
+        try:
+            with span("server.query"):
+                result = future.result(timeout=self.server.timeout_s)
+        except FutureTimeout:
+            future.cancel()  # only takes effect if the job has not started yet
+            return self._send(504, {"error": "query timed out"})
+        except BrokenProcessPool:
+            self.server.recover()
+            return self._send(503, {"error": "worker process died, retry"}, headers={"Retry-After": "1"})
+        except Exception as exc:
+            return self._send(500, {"error": f"{type(exc).__name__}: {exc}"})
+        self._send(200, result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-worker HTTP service for the financial planner agents")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--max-inflight", type=int, default=64, help="queued + running queries before 503")
+    parser.add_argument("--data-dir", default=SERVER_DATA_DIR, help="per-user memory-mapped column files")
+    parser.add_argument("--users", default="demo", help="comma-separated users to provision with mock data if missing")
+    parser.add_argument("--transactions", type=int, default=300, help="mock transactions per provisioned user")
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args()
+
+    from utils.data_generator import generate_transactions
+    for i, user in enumerate(u.strip() for u in args.users.split(",") if u.strip()):
+        if not has_user(args.data_dir, user):
+            provision_user(args.data_dir, user, generate_transactions(args.transactions, seed=i))
+            print(f"Provisioned {user} with {args.transactions} mock transactions")
+
+    _Handler.verbose = args.verbose
+    server = PlannerServer((args.host, args.port), args.data_dir, args.workers, args.max_inflight)
+    print(f"Serving on http://{args.host}:{server.server_address[1]} "
+          f"({server.workers} workers, max {args.max_inflight} in flight)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
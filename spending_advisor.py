@@ -3,34 +3,76 @@
 Daily Spending Advisor agent:
 - Categorizes expenses (we have category column already; in a real scenario we'd infer),
 - Identifies unusual spending (simple z-score on category totals),
+  plus a per-transaction streaming detector (anomaly_detector) for live feeds,
 - Produces visualizations (via utils.visualizer).
+- `start` / `end` restrict the analysis to a date window [start, end), served
+  from the store's time index without scanning rows outside it.
 """
-import pandas as pd
+import contextvars
 import numpy as np
-from scipy import stats
-from utils.visualizer import save_category_breakdown, save_timeseries
+from functools import partial
+from anomaly_detector import StreamingAnomalyDetector
+from utils.downsample import MAX_POINTS
+from utils.lazy_imports import lazy_import
+from utils.tracing import span
+from utils.transaction_store import as_store
 
 class SpendingAdvisor:
-    def __init__(self, transactions: pd.DataFrame):
-        self.transactions = transactions.copy()
+    def __init__(self, transactions, start=None, end=None):
+        # accepts a shared TransactionStore or a raw DataFrame
+        self.store = as_store(transactions)
+        if start is not None or end is not None:
+            self.store = self.store.window(start, end)
+
+    @property
+    def transactions(self):
+        # typed rows, materialized only when a caller actually needs them
+        return self.store.frame
+
+    @property
+    def rollups(self):
+        # per-category/day/month totals maintained by the store
+        return self.store.rollups
 
     def category_breakdown(self):
-        return self.transactions.groupby("category")["amount"].sum()
+        return self.rollups.category_totals()
 
     def unusual_spending(self, z_thresh=2.0):
-        # Aggregate absolute spending per category and find z-score
-        agg = self.transactions.groupby("category")["amount"].sum().abs()
-        if len(agg) < 2:
-            return []
-        z = np.abs(stats.zscore(agg))
-        outliers = agg.index[z > z_thresh].tolist()
-        return outliers
-
-    def generate_visuals(self, out_dir="./outputs"):
-        cat_img = save_category_breakdown(self.transactions, f"{out_dir}/spending_breakdown.png")
-        ts_img = save_timeseries(self.transactions, f"{out_dir}/spending_timeseries.png")
-        return {"category_chart": cat_img, "timeseries_chart": ts_img}
+        with span("spending.unusual"):
+            # Aggregate absolute spending per category and find z-score
+            agg = self.rollups.category_totals().abs()
+            if len(agg) < 2:
+                return []
+            # scipy is only loaded when an outlier check actually runs
+            z = np.abs(lazy_import("scipy.stats").zscore(agg))
+            outliers = agg.index[z > z_thresh].tolist()
+            return outliers
+
+    def transaction_detector(self, **kwargs) -> StreamingAnomalyDetector:
+        """Streaming per-transaction detector warm-started from this history."""
+        return StreamingAnomalyDetector.from_transactions(self.transactions, **kwargs)
+
+    def generate_visuals(self, out_dir="./outputs", executor=None, resolution="day", max_points=MAX_POINTS):
+        """
+        Charts are named by a hash of the plotted totals, so unchanged data
+        reuses the existing PNGs. Pass an executor to render both in parallel.
+        The timeseries is bucketed by `resolution` (day/week/month) and capped
+        at `max_points` points.
+        """
+        with span("spending.visuals"):
+            visualizer = lazy_import("utils.visualizer")  # matplotlib loads on first chart
+            jobs = [partial(visualizer.render_category_chart, self.rollups.category_totals(), out_dir),
+                    partial(visualizer.render_timeseries_chart, self.rollups.daily_totals(), out_dir,
+                            resolution, max_points)]
+            if executor is None:
+                cat_img, ts_img = [job() for job in jobs]
+            else:
+                # run each job in a copy of our context so chart spans reach the query's breakdown
+                futures = [executor.submit(contextvars.copy_context().run, job) for job in jobs]
+                cat_img, ts_img = [f.result() for f in futures]
+            return {"category_chart": cat_img, "timeseries_chart": ts_img}
 
     def summary(self, top_n=5):
-        agg = self.transactions.groupby("category")["amount"].sum().abs().sort_values(ascending=False)
-        return agg.head(top_n).to_dict()
+        with span("spending.summary"):
+            agg = self.rollups.category_totals().abs().sort_values(ascending=False)
+            return agg.head(top_n).to_dict()
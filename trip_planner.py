@@ -1,15 +1,33 @@
-
 """
 Trip Planning Assistant:
 - Uses simulated travel pricing (assignment allows simulated responses).
 - Builds a budget plan based on user's current finances and requested trip budget.
+- `simulate_cost_distribution` / `evaluate_many` draw many priced scenarios in one
+  seeded NumPy batch (per-destination flight plus per-day hotel, food and
+  activities, so cost grows with trip length) and report percentile costs and
+  the chance of staying within budget and balance.
 """
-from typing import Dict
+from typing import Dict, List
 import random
+import numpy as np
+from utils.tracing import span
+
+# simulated prices in dollars (uniform ranges): flight is per trip (round trip),
+# everything else per day; destinations not listed use "default"
+PRICE_RANGES = {
+    "NYC": {"flight": (250, 650), "hotel": (180, 380), "activities": (40, 120), "food": (60, 120)},
+    "default": {"flight": (200, 800), "hotel": (90, 250), "activities": (20, 90), "food": (35, 90)},
+}
+PER_DAY_ITEMS = ("hotel", "activities", "food")
+COST_ITEMS = ("flight",) + PER_DAY_ITEMS
+PERCENTILES = (5, 50, 95)
 
 class TripPlanner:
-    def __init__(self, user_balance: float):
+    def __init__(self, user_balance: float, seed: int = None):
         self.user_balance = user_balance
+        # seeded generators make plans reproducible; seed=None keeps them random
+        self._random = random.Random(seed)
+        self._rng = np.random.default_rng(seed)
 
     def simulate_travel_options(self, destination: str, days: int, budget: float) -> Dict:
         """
@@ -17,9 +35,9 @@ class TripPlanner:
         (keeps strictly to assignment requirement: simulate or integrate travel APIs).
         """
         # Simulate categories
-        flight = round(budget * random.uniform(0.2, 0.4), 2)
-        hotel = round(budget * random.uniform(0.25, 0.45), 2)
-        activities = round(budget * random.uniform(0.1, 0.2), 2)
+        flight = round(budget * self._random.uniform(0.2, 0.4), 2)
+        hotel = round(budget * self._random.uniform(0.25, 0.45), 2)
+        activities = round(budget * self._random.uniform(0.1, 0.2), 2)
         daily_food = round((budget - (flight + hotel + activities)) / (days or 1), 2)
         plan = {
             "destination": destination,
@@ -34,3 +52,55 @@ class TripPlanner:
             "feasible": budget <= self.user_balance or (budget * 0.5) <= self.user_balance
         }
         return plan
+
+    def _simulate_costs(self, destinations: List[str], days: np.ndarray, n_samples: int) -> Dict[str, np.ndarray]:
+        """
+        Cost draws of shape (requests, n_samples) per line item, plus their total.
+        Prices depend only on destination and trip length, never on the budget.
+        """
+        prices = [PRICE_RANGES.get(str(d).upper(), PRICE_RANGES["default"]) for d in destinations]
+        units = np.maximum(days, 1)[:, None]
+        costs = {}
+        for item in COST_ITEMS:
+            lo = np.array([p[item][0] for p in prices], dtype=float)[:, None]
+            hi = np.array([p[item][1] for p in prices], dtype=float)[:, None]
+            cost = lo + (hi - lo) * self._rng.random((len(prices), n_samples))
+            costs[item] = cost * units if item in PER_DAY_ITEMS else cost
+        costs["total"] = sum(costs.values())
+        return costs
+
+    def evaluate_many(self, requests: List[Dict], n_samples: int = 20_000) -> List[Dict]:
+        """
+        Monte Carlo cost risk for many trip requests (each a dict with
+        destination, days, budget) in one vectorized batch.
+        """
+        if not requests:
+            return []
+        destinations = [r.get("destination", "Unknown") for r in requests]
+        days = np.array([int(r.get("days", 3)) for r in requests])
+        budgets = np.array([float(r.get("budget", 1000.0)) for r in requests])
+        with span("trip.simulate"):
+            costs = self._simulate_costs(destinations, days, n_samples)
+        total = costs["total"]
+        pct = np.percentile(total, PERCENTILES, axis=1)
+        item_means = {item: costs[item].mean(axis=1) for item in COST_ITEMS}
+        p_budget = (total <= budgets[:, None]).mean(axis=1)
+        p_balance = (total <= self.user_balance).mean(axis=1)
+        results = []
+        for i, r in enumerate(requests):
+            results.append({
+                "destination": destinations[i],
+                "days": int(days[i]),
+                "budget": float(budgets[i]),
+                "samples": n_samples,
+                "cost_percentiles": {f"p{p}": round(float(pct[j, i]), 2) for j, p in enumerate(PERCENTILES)},
+                "expected_breakdown": {f"{item}_estimate": round(float(item_means[item][i]), 2) for item in COST_ITEMS},
+                "expected_daily_food": round(float(item_means["food"][i]) / max(int(days[i]), 1), 2),
+                "prob_within_budget": round(float(p_budget[i]), 4),
+                "prob_within_balance": round(float(p_balance[i]), 4),
+            })
+        return results
+
+    def simulate_cost_distribution(self, destination: str, days: int, budget: float, n_samples: int = 20_000) -> Dict:
+        """Monte Carlo version of simulate_travel_options for a single request."""
+        return self.evaluate_many([{"destination": destination, "days": days, "budget": budget}], n_samples)[0]
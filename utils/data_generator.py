@@ -1,36 +1,122 @@
-
 """
 Generate mock transactions & user profile data using Faker (as required by the PDF).
 Output is a pandas DataFrame of transactions (date, amount, merchant, category).
+
+Rows are drawn in NumPy batches from a seeded generator; merchants come from a
+pool of Faker names (at most one name per row) that is built once per
+(size, seed) and reused, instead of one Faker call per row.
+`iter_transactions` yields fixed-size chunks so very large synthetic sets can be
+streamed to disk without holding them in memory.
 """
-from faker import Faker
+import threading
 import pandas as pd
-import random
+import numpy as np
 from datetime import datetime, timedelta
-
-fake = Faker()
+from functools import lru_cache
+from utils.lazy_imports import lazy_import
 
 CATEGORIES = ["groceries", "dining", "transport", "entertainment", "utilities", "salary", "rent", "shopping"]
+WEIGHTS = [15, 12, 10, 8, 6, 10, 12, 7]
 
-def generate_transactions(n: int = 500, start_date: str = None):
-    """Generate n mock transactions over the past ~6 months by default."""
+HISTORY_DAYS = 180
+MERCHANT_POOL_SIZE = 500
+DEFAULT_CHUNK_SIZE = 100_000
+
+_PROBS = np.asarray(WEIGHTS, dtype=float) / sum(WEIGHTS)
+_SALARY = CATEGORIES.index("salary")
+_RENT = CATEGORIES.index("rent")
+
+
+def _start_date(start_date: str = None) -> np.datetime64:
     if start_date:
         start = datetime.fromisoformat(start_date)
     else:
-        start = datetime.now() - timedelta(days=180)
-
-    rows = []
-    for _ in range(n):
-        days_offset = random.randint(0, 180)
-        date = (start + timedelta(days=days_offset)).date().isoformat()
-        category = random.choices(CATEGORIES, weights=[15,12,10,8,6,10,12,7])[0]
-        merchant = fake.company() if random.random() > 0.2 else fake.first_name() + " Shop"
-        amount = round(random.uniform(3.0, 200.0), 2)
-        # salary and rent larger amounts and occasional negative (income)
-        if category == "salary":
-            amount = round(random.uniform(1500, 5000), 2) * -1  # negative to indicate credit
-        if category == "rent":
-            amount = round(random.uniform(400, 2000), 2)
-        rows.append({"date": date, "amount": amount, "merchant": merchant, "category": category})
-    df = pd.DataFrame(rows)
+        start = datetime.now() - timedelta(days=HISTORY_DAYS)
+    return np.datetime64(start.date(), "D")
+
+
+def __getattr__(name):
+    # `fake` used to be a module-level Faker(); build it only if someone asks
+    if name == "fake":
+        globals()["fake"] = lazy_import("faker").Faker()
+        return globals()["fake"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+_fake_lock = threading.Lock()
+
+
+@lru_cache(maxsize=32)
+def merchant_pool(size: int = MERCHANT_POOL_SIZE, seed: int = None) -> np.ndarray:
+    """
+    Pre-generate merchant names: ~80% company names, ~20% '<first name> Shop'.
+    Pools are cached per (size, seed) and returned read-only.
+    """
+    with _fake_lock:  # the shared Faker is reseeded per pool
+        faker = globals().get("fake") or __getattr__("fake")
+        faker.seed_instance(seed)
+        n_shops = max(1, size // 5)
+        names = [faker.company() for _ in range(size - n_shops)]
+        names += [faker.first_name() + " Shop" for _ in range(n_shops)]
+    pool = np.asarray(names, dtype=object)
+    pool.setflags(write=False)
+    return pool
+
+
+def _draw(rng: np.random.Generator, n: int, start: np.datetime64, merchants: np.ndarray,
+          n_users: int = None) -> pd.DataFrame:
+    days_offset = rng.integers(0, HISTORY_DAYS + 1, size=n)
+    dates = np.datetime_as_string(start + days_offset.astype("timedelta64[D]"), unit="D")
+    cat_idx = rng.choice(len(CATEGORIES), size=n, p=_PROBS)
+    amount = rng.uniform(3.0, 200.0, size=n)
+    # salary and rent larger amounts; salary negative to indicate credit
+    salary = cat_idx == _SALARY
+    rent = cat_idx == _RENT
+    amount[salary] = -rng.uniform(1500, 5000, size=int(salary.sum()))
+    amount[rent] = rng.uniform(400, 2000, size=int(rent.sum()))
+    df = pd.DataFrame({
+        "date": dates.astype(object),
+        "amount": np.round(amount, 2),
+        "merchant": merchants[rng.integers(0, len(merchants), size=n)],
+        "category": np.asarray(CATEGORIES, dtype=object)[cat_idx],
+    })
+    if n_users:
+        # fleet data for batch jobs: one table, many accounts
+        width = len(str(n_users - 1))
+        df.insert(0, "user_id", np.char.add("user_", np.char.zfill(rng.integers(0, n_users, size=n).astype(str), width)).astype(object))
     return df
+
+
+def iter_transactions(n: int, chunk_size: int = DEFAULT_CHUNK_SIZE, start_date: str = None, seed: int = None,
+                      n_users: int = None):
+    """
+    Yield n mock transactions as DataFrames of at most chunk_size rows.
+    The same (n, seed, chunk_size) always yields the same rows.
+    With n_users, rows are spread over that many accounts in a `user_id` column.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    rng = np.random.default_rng(seed)
+    start = _start_date(start_date)
+    merchants = merchant_pool(min(MERCHANT_POOL_SIZE, max(n, 1)), seed)
+    produced = 0
+    while produced < n:
+        size = min(chunk_size, n - produced)
+        yield _draw(rng, size, start, merchants, n_users)
+        produced += size
+
+
+def generate_transactions(n: int = 500, start_date: str = None, seed: int = None, n_users: int = None):
+    """Generate n mock transactions over the past ~6 months by default."""
+    if n <= 0:
+        return pd.DataFrame(columns=(["user_id"] if n_users else []) + ["date", "amount", "merchant", "category"])
+    return next(iter_transactions(n, chunk_size=n, start_date=start_date, seed=seed, n_users=n_users))
+
+
+def write_transactions_csv(path: str, n: int, chunk_size: int = DEFAULT_CHUNK_SIZE, start_date: str = None, seed: int = None,
+                           n_users: int = None) -> str:
+    """Stream n mock transactions to a CSV file chunk by chunk."""
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        for i, chunk in enumerate(iter_transactions(n, chunk_size, start_date, seed, n_users)):
+            chunk.to_csv(f, index=False, header=(i == 0))
+    return path
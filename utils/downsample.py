@@ -0,0 +1,58 @@
+"""
+Timeseries reduction before plotting.
+- `resample_totals` re-buckets daily totals to day / week / month resolution.
+- `lttb` (largest-triangle-three-buckets) picks at most n points that keep the
+  visual shape of the series, including its peaks.
+Together they keep chart render time bounded no matter how long the history is.
+"""
+import numpy as np
+import pandas as pd
+
+RESOLUTIONS = {"day": "D", "week": "W", "month": "MS"}
+MAX_POINTS = 1000
+
+
+def resample_totals(daily: pd.Series, resolution: str = "day") -> pd.Series:
+    """Sum a date-indexed series into day/week/month buckets (empty buckets dropped)."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"resolution must be one of {list(RESOLUTIONS)}")
+    daily = daily.sort_index()
+    if resolution == "day" or daily.empty:
+        return daily
+    counts = daily.resample(RESOLUTIONS[resolution]).count()
+    return daily.resample(RESOLUTIONS[resolution]).sum()[counts > 0]
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Return the indices of the points kept by largest-triangle-three-buckets.
+    The first and last points are always kept; each bucket in between keeps the
+    point forming the largest triangle with the previous pick and the next
+    bucket's average.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+    picked = np.empty(n_out, dtype=int)
+    picked[0], picked[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nxt_lo, nxt_hi = hi, edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = x[nxt_lo:nxt_hi].mean()
+        avg_y = y[nxt_lo:nxt_hi].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def downsample(series: pd.Series, max_points: int = MAX_POINTS) -> pd.Series:
+    """LTTB-reduce a date-indexed series to at most max_points points."""
+    if max_points is None or len(series) <= max_points:
+        return series
+    x = series.index.asi8 if isinstance(series.index, pd.DatetimeIndex) else np.arange(len(series))
+    return series.iloc[lttb(x, series.to_numpy(), max_points)]
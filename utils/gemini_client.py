@@ -1,12 +1,22 @@
-
 """
 Simple wrapper for Gemini 2.0 Flash LLM usage.
 Reads GEMINI_API_KEY from .env. Uses a minimal HTTP interface via requests.
 This wrapper provides a single function `call_gemini(prompt, max_tokens=...)`.
+
+`call_gemini` goes through a shared `GeminiClient`, which keeps a pooled
+keep-alive Session, retries transient failures (not read timeouts) with
+bounded exponential backoff inside a per-call deadline, and trips a circuit
+breaker so that while the endpoint is known to be down callers fail
+immediately (and the RouterAgent falls back to its keyword heuristic) instead
+of waiting for a timeout on every query.
 """
 import os
 import json
+import random
+import threading
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -18,30 +28,171 @@ if not GEMINI_KEY:
     # For the assignment, ensure user sets GEMINI_API_KEY in .env
     pass
 
-GEMINI_BASE = "https://gemini.googleapis.com/v1"  # placeholder base; wrapper is general
+GEMINI_BASE = os.getenv("GEMINI_BASE_URL", "https://gemini.googleapis.com/v1")  # placeholder base; wrapper is general
 
-def call_gemini(prompt: str, max_tokens: int = 256, model: str = "gemini-2.0-flash") -> str:
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without touching the network while the circuit breaker is open."""
+
+
+class CircuitBreaker:
     """
-    Call Gemini 2.0 Flash model with simple prompt -> text response.
-    NOTE: Depending on the actual API, endpoint and headers may vary; adapt as needed.
+    closed -> open after `failure_threshold` consecutive failures;
+    open -> half-open once `reset_timeout` seconds have passed (one trial call);
+    half-open -> closed on success, back to open on failure.
     """
-    if not GEMINI_KEY:
-        raise RuntimeError("GEMINI_API_KEY not set in environment (.env).")
-
-    # Example request structure — adapt to the real Gemini HTTP API / SDK when available.
-    url = f"{GEMINI_BASE}/models/{model}:predict"
-    headers = {
-        "Authorization": f"Bearer {GEMINI_KEY}",
-        "Content-Type": "application/json",
-    }
-    payload = {
-        "prompt": prompt,
-        "maxTokens": max_tokens,
-    }
-
-    resp = requests.post(url, headers=headers, data=json.dumps(payload), timeout=15)
-    resp.raise_for_status()
-    data = resp.json()
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+
+class GeminiClient:
+    def __init__(self, api_key: str = None, base_url: str = None, timeout=(3.05, 10.0),
+                 max_retries: int = 2, backoff: float = 0.25, max_backoff: float = 2.0,
+                 pool_size: int = 10, breaker: CircuitBreaker = None, deadline: float = 12.0):
+        self.api_key = api_key if api_key is not None else GEMINI_KEY
+        self.base_url = (base_url or GEMINI_BASE).rstrip("/")
+        self.timeout = timeout  # (connect, read) seconds
+        self.deadline = deadline  # seconds one generate() call may spend, retries and backoff included
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "requests": 0, "errors": 0, "retries": 0,
+                       "short_circuits": 0, "latency_total": 0.0, "latency_max": 0.0}
+
+    def _count(self, **deltas):
+        with self._lock:
+            for k, v in deltas.items():
+                self._stats[k] += v
+
+    def metrics(self) -> dict:
+        """Counters plus mean/max request latency (seconds) and breaker state."""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["latency_mean"] = stats["latency_total"] / stats["requests"] if stats["requests"] else 0.0
+        stats["circuit"] = self.breaker.state
+        return stats
+
+    def _backoff_delay(self, attempt: int) -> float:
+        return min(self.max_backoff, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.0)
+
+    def _post(self, url: str, headers: dict, payload: dict, timeout=None):
+        start = time.perf_counter()
+        try:
+            return self.session.post(url, headers=headers, data=json.dumps(payload), timeout=timeout or self.timeout)
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self._stats["requests"] += 1
+                self._stats["latency_total"] += elapsed
+                self._stats["latency_max"] = max(self._stats["latency_max"], elapsed)
+
+    def generate(self, prompt: str, max_tokens: int = 256, model: str = "gemini-2.0-flash") -> str:
+        if not self.api_key:
+            raise RuntimeError("GEMINI_API_KEY not set in environment (.env).")
+        self._count(calls=1)
+        if not self.breaker.allow():
+            self._count(short_circuits=1)
+            raise CircuitOpenError("Gemini endpoint marked unhealthy; skipping request.")
+
+        # Example request structure — adapt to the real Gemini HTTP API / SDK when available.
+        url = f"{self.base_url}/models/{model}:predict"
+        headers = {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+        }
+        payload = {
+            "prompt": prompt,
+            "maxTokens": max_tokens,
+        }
+
+        started = time.monotonic()
+        settled = False  # whether the breaker already heard about this call
+        try:
+            for attempt in range(self.max_retries + 1):
+                remaining = self.deadline - (time.monotonic() - started)
+                connect, read = self.timeout
+                try:
+                    resp = self._post(url, headers, payload, (min(connect, remaining), min(read, remaining)))
+                except requests.ReadTimeout:
+                    # the endpoint accepted the request but is slow; retrying would multiply the wait
+                    self._count(errors=1)
+                    raise
+                except requests.RequestException:
+                    self._count(errors=1)
+                    if attempt == self.max_retries:
+                        raise
+                else:
+                    if resp.status_code not in RETRY_STATUS:
+                        if not resp.ok:
+                            # client errors (bad key/request) say nothing about endpoint health
+                            self._count(errors=1)
+                        self.breaker.record_success()
+                        settled = True
+                        resp.raise_for_status()
+                        return extract_text(resp.json())
+                    self._count(errors=1)
+                    if attempt == self.max_retries:
+                        resp.raise_for_status()
+                delay = self._backoff_delay(attempt)
+                if time.monotonic() - started + delay >= self.deadline:
+                    raise requests.Timeout(f"Gemini call exceeded its {self.deadline}s deadline")
+                self._count(retries=1)
+                time.sleep(delay)
+        except BaseException:
+            # any failure, including unexpected ones, must close out a half-open trial
+            if not settled:
+                self.breaker.record_failure()
+            raise
+        return ""
+
+
+def extract_text(data) -> str:
+    """Pull the generated text out of a response body."""
     # Try to extract common fields safely
     text = None
     # common patterns: data['predictions'][0]['content'] or data['output'][0] etc.
@@ -57,3 +208,24 @@ def call_gemini(prompt: str, max_tokens: int = 256, model: str = "gemini-2.0-fla
         text = str(data)
 
     return text or ""
+
+
+_default_client = None
+_default_lock = threading.Lock()
+
+
+def get_client() -> GeminiClient:
+    """Process-wide client, so every caller shares one connection pool and breaker."""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = GeminiClient()
+        return _default_client
+
+
+def call_gemini(prompt: str, max_tokens: int = 256, model: str = "gemini-2.0-flash") -> str:
+    """
+    Call Gemini 2.0 Flash model with simple prompt -> text response.
+    NOTE: Depending on the actual API, endpoint and headers may vary; adapt as needed.
+    """
+    return get_client().generate(prompt, max_tokens=max_tokens, model=model)
@@ -0,0 +1,88 @@
+"""
+LRU + TTL cache for intent labels, keyed on the normalized query text.
+- In-memory OrderedDict for the hot set (thread-safe).
+- Optional SQLite file so cached labels survive restarts.
+  Set INTENT_CACHE_PATH in .env to enable it for the default cache.
+"""
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+_PUNCT = re.compile(r"[^\w\s$]")
+_SPACE = re.compile(r"\s+")
+
+
+def normalize_query(query: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace so near-identical queries share a key."""
+    return _SPACE.sub(" ", _PUNCT.sub(" ", query.lower())).strip()
+
+
+class IntentCache:
+    def __init__(self, maxsize: int = 1024, ttl: float = 24 * 3600, path: str = None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()  # key -> (label, expires_at)
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS intents (key TEXT PRIMARY KEY, label TEXT, expires REAL)"
+            )
+            self._db.commit()
+
+    def _trim(self):
+        # caller holds the lock
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None and self._db is not None:
+                row = self._db.execute("SELECT label, expires FROM intents WHERE key = ?", (key,)).fetchone()
+                if row and row[1] >= now:  # expired rows are not promoted
+                    entry = (row[0], row[1])
+                    self._data[key] = entry
+                    self._trim()
+            if entry is None or entry[1] < now:
+                if entry is not None:
+                    self._data.pop(key, None)
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def set(self, key: str, label: str):
+        entry = (label, time.time() + self.ttl)
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            self._trim()
+            if self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO intents VALUES (?, ?, ?)", (key, *entry))
+                self._db.execute("DELETE FROM intents WHERE expires < ?", (time.time(),))
+                self._db.commit()
+
+    def __len__(self):
+        return len(self._data)
+
+
+_default_cache = None
+
+
+def default_intent_cache() -> IntentCache:
+    """Process-wide cache shared by all RouterAgents (so repeated queries hit across sessions)."""
+    global _default_cache
+    if _default_cache is None:
+        from dotenv import load_dotenv
+        load_dotenv()
+        _default_cache = IntentCache(path=os.getenv("INTENT_CACHE_PATH"))
+    return _default_cache
@@ -0,0 +1,39 @@
+"""
+Deferred imports with timing, to keep CLI / Streamlit cold start small.
+- `lazy_import(name)` imports a module on first use and records how long it took
+  (inclusive of any dependencies it pulled in for the first time).
+- `import_report()` returns the recorded per-module times, slowest first, so the
+  CLI can show what startup and each first use actually cost.
+- STARTUP_BUDGET_MS (env, default 1500) is the cold-start target checked by
+  `within_budget`.
+"""
+import importlib
+import os
+import sys
+import time
+
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "1500"))
+
+_import_times = {}  # module name -> milliseconds
+
+
+def lazy_import(name: str):
+    """Return module `name`, importing (and timing) it on first use."""
+    module = sys.modules.get(name)
+    # a module another thread is still importing is already in sys.modules but
+    # half-initialized; import_module waits on its import lock instead
+    if module is not None and not getattr(module.__spec__, "_initializing", False):
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    _import_times.setdefault(name, (time.perf_counter() - start) * 1000)
+    return module
+
+
+def import_report() -> list:
+    """[(module, ms), ...] for every module loaded through lazy_import, slowest first."""
+    return sorted(_import_times.items(), key=lambda item: item[1], reverse=True)
+
+
+def within_budget(elapsed_ms: float) -> bool:
+    return elapsed_ms <= STARTUP_BUDGET_MS
@@ -0,0 +1,111 @@
+"""
+Agent parameters from a plain-text query, shared by the CLI (main.py) and the
+Streamlit app so both parse queries the same way.
+- Purchase queries ("buy", "purchase", "car", "save"): target_amount, months.
+- Trip queries ("trip", "nyc"): budget, days, destination.
+- Any query: a date window as ISO `start` / `end` ([start, end)) from phrases
+  like "last month", "this quarter", "past 30 days" or "yesterday". Only the
+  spending agent narrows its data to it; purchase and trip plans ignore it.
+Patterns are compiled once at import. "$"-prefixed amounts win over bare
+numbers, so "a 14-day trip for $2000" budgets 2000, not 14.
+"""
+import re
+from datetime import date, timedelta
+
+_PURCHASE_WORDS = re.compile(r"buy|purchase|car|save")
+_TRIP_WORDS = re.compile(r"trip|nyc")
+_DOLLARS = re.compile(r"\$(\d+(?:\.\d{1,2})?)")
+_TARGET_AMOUNT = re.compile(r"\$?(\d{3,}(?:\.\d{1,2})?)")
+_MONTHS = re.compile(r"(\d+)\s*-?\s*(months|month|m)")
+_BUDGET = re.compile(r"\$?(\d{2,5})")
+_DAYS = re.compile(r"(\d+)\s*-?\s*(day|days)")
+_WINDOW = re.compile(
+    r"\b(?:(?P<rel>this|last|previous|past)\s+(?:(?P<n>\d+)\s+)?(?P<unit>day|week|month|quarter|year)s?"
+    r"|(?P<day>today|yesterday))\b"
+)
+
+_MONTHS_PER_UNIT = {"month": 1, "quarter": 3, "year": 12}
+
+
+def _shift_months(d: date, months: int) -> date:
+    y, m = divmod(d.year * 12 + d.month - 1 + months, 12)
+    return date(y, m + 1, 1)
+
+
+def extract_window(query: str, today: date = None):
+    """(start, end, matched text) for a relative date phrase, or None."""
+    m = _WINDOW.search(query.lower())
+    if not m:
+        return None
+    today = today or date.today()
+    tomorrow = today + timedelta(days=1)
+    if m.group("day"):
+        start = today if m.group("day") == "today" else today - timedelta(days=1)
+        return start, start + timedelta(days=1), m.group(0)
+    rel, unit = m.group("rel"), m.group("unit")
+    if m.group("n") or rel == "past":
+        # rolling window ending today: "past 30 days", "last 3 months"
+        n = int(m.group("n") or 1)
+        if unit in ("day", "week"):
+            start = tomorrow - timedelta(days=n * (7 if unit == "week" else 1))
+        else:
+            start = _rolling_month_start(today, n * _MONTHS_PER_UNIT[unit])
+        return start, tomorrow, m.group(0)
+    # calendar periods: "this month", "last quarter", ...
+    if unit == "day":
+        start = today if rel == "this" else today - timedelta(days=1)
+        return start, start + timedelta(days=1), m.group(0)
+    if unit == "week":
+        this_start = today - timedelta(days=today.weekday())
+        start = this_start if rel == "this" else this_start - timedelta(days=7)
+        return start, (tomorrow if rel == "this" else this_start), m.group(0)
+    months = _MONTHS_PER_UNIT[unit]
+    if unit == "month":
+        this_start = today.replace(day=1)
+    elif unit == "quarter":
+        this_start = date(today.year, (today.month - 1) // 3 * 3 + 1, 1)
+    else:
+        this_start = date(today.year, 1, 1)
+    if rel == "this":
+        return this_start, tomorrow, m.group(0)
+    return _shift_months(this_start, -months), this_start, m.group(0)
+
+
+def _rolling_month_start(today: date, months: int) -> date:
+    # same day-of-month `months` ago (clamped to that month's length), plus one day
+    first = _shift_months(today.replace(day=1), -months)
+    last_day = (_shift_months(first, 1) - timedelta(days=1)).day
+    return first.replace(day=min(today.day, last_day)) + timedelta(days=1)
+
+
+def _amount(text: str, fallback: re.Pattern):
+    m = _DOLLARS.search(text) or fallback.search(text)
+    return float(m.group(1)) if m else None
+
+
+def extract_params(query: str, today: date = None) -> dict:
+    """kwargs for RouterAgent.handle; empty when the query carries no parameters."""
+    q = query.lower()
+    kwargs = {}
+    window = extract_window(q, today)
+    if window:
+        start, end, phrase = window
+        kwargs["start"], kwargs["end"] = start.isoformat(), end.isoformat()
+        q = q.replace(phrase, " ")  # so "last 3 months" is not read as a purchase horizon
+    digits = q.replace(",", "")
+    if _PURCHASE_WORDS.search(q):
+        amount = _amount(digits, _TARGET_AMOUNT)
+        if amount is not None:
+            kwargs["target_amount"] = amount
+        m = _MONTHS.search(q)
+        if m:
+            kwargs["months"] = int(m.group(1))
+    if _TRIP_WORDS.search(q):
+        amount = _amount(digits, _BUDGET)
+        if amount is not None:
+            kwargs["budget"] = amount
+        m = _DAYS.search(q)
+        if m:
+            kwargs["days"] = int(m.group(1))
+        kwargs["destination"] = "NYC" if "nyc" in q else "Unknown"
+    return kwargs
@@ -0,0 +1,62 @@
+"""
+Pre-aggregated spending rollups (per category, per day, per month).
+- Built once from the typed transaction frame.
+- `update(batch)` folds newly appended transactions in with a groupby over the
+  batch only, so the cost depends on the batch size, not on the history.
+- Agents and charts read totals/counts from here instead of running their own
+  groupby over the full table.
+"""
+import pandas as pd
+
+FIELDS = ["total", "count"]
+
+
+def _empty(index_name: str) -> pd.DataFrame:
+    df = pd.DataFrame({"total": pd.Series(dtype="float64"), "count": pd.Series(dtype="int64")})
+    return df.rename_axis(index_name)
+
+
+def _aggregate(amount: pd.Series, key: pd.Series) -> pd.DataFrame:
+    agg = amount.groupby(key, observed=True).agg(["sum", "count"])
+    return agg.rename(columns={"sum": "total"})
+
+
+def _merge(current: pd.DataFrame, batch: pd.DataFrame) -> pd.DataFrame:
+    if current.empty:
+        return batch.astype({"count": "int64"})
+    merged = current.add(batch, fill_value=0).sort_index()
+    return merged.astype({"count": "int64"})
+
+
+class SpendingRollups:
+    def __init__(self):
+        self.by_category = _empty("category")
+        self.by_day = _empty("date")
+        self.by_month = _empty("month")
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> "SpendingRollups":
+        rollups = cls()
+        rollups.update(df)
+        return rollups
+
+    def update(self, batch: pd.DataFrame):
+        """Fold a typed batch of transactions into the rollups."""
+        if batch.empty:
+            return
+        amount = batch["amount"]
+        category = batch["category"].astype(str).rename("category")
+        day = batch["date"].dt.normalize().rename("date")
+        month = batch["date"].dt.to_period("M").rename("month")
+        self.by_category = _merge(self.by_category, _aggregate(amount, category))
+        self.by_day = _merge(self.by_day, _aggregate(amount, day))
+        self.by_month = _merge(self.by_month, _aggregate(amount, month))
+
+    def category_totals(self) -> pd.Series:
+        return self.by_category["total"].rename("amount")
+
+    def daily_totals(self) -> pd.Series:
+        return self.by_day["total"].rename("amount")
+
+    def monthly_totals(self) -> pd.Series:
+        return self.by_month["total"].rename("amount")
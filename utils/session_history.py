@@ -0,0 +1,180 @@
+"""
+Bounded, persistent query history for a RouterAgent session.
+- The last `maxlen` entries live in a ring buffer (collections.deque), so a
+  long-lived session uses flat memory.
+- With a history directory set (`history_dir` or SESSION_HISTORY_DIR in .env)
+  every entry is also appended to `<dir>/<session>/log.jsonl`, and every
+  `snapshot_every` entries the ring buffer is written to `snapshot.json`
+  together with the log offset it covers.
+- Restore reads the snapshot plus the few log lines written after it, so
+  startup cost does not grow with the length of the history; `iter_all` /
+  `query` scan the full log on disk.
+- The log expects a single writer per session: get persisted histories from
+  `shared_history`, which hands every caller in the process the same instance.
+"""
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import deque
+
+HISTORY_MAXLEN = int(os.getenv("SESSION_HISTORY_MAXLEN", "100"))
+SNAPSHOT_EVERY = 100
+_SAFE_ID = re.compile(r"[^\w-]")
+
+
+def default_history_dir():
+    """SESSION_HISTORY_DIR from the environment / .env (None keeps history in memory only)."""
+    from dotenv import load_dotenv
+    load_dotenv()
+    return os.getenv("SESSION_HISTORY_DIR") or None
+
+
+class SessionHistory:
+    def __init__(self, session_id: str, history_dir: str = None, maxlen: int = HISTORY_MAXLEN,
+                 snapshot_every: int = SNAPSHOT_EVERY):
+        self.session_id = str(session_id)
+        self.maxlen = maxlen
+        self.snapshot_every = snapshot_every
+        self.total = 0  # entries ever recorded, including those only on disk
+        self._recent = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self._log = None
+        self._since_snapshot = 0
+        self.path = None
+        if history_dir:
+            self.path = os.path.join(history_dir, _SAFE_ID.sub("_", self.session_id))
+            os.makedirs(self.path, exist_ok=True)
+            self._restore()
+            self._log = open(self._log_path, "a", encoding="utf-8")
+
+    @property
+    def _log_path(self):
+        return os.path.join(self.path, "log.jsonl")
+
+    @property
+    def _snapshot_path(self):
+        return os.path.join(self.path, "snapshot.json")
+
+    def _restore(self):
+        offset = 0
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, encoding="utf-8") as f:
+                snap = json.load(f)
+            self._recent.extend(snap["recent"])
+            self.total = snap["total"]
+            offset = snap["log_offset"]
+        if not os.path.exists(self._log_path):
+            return
+        with open(self._log_path, "rb+") as f:
+            f.seek(offset)
+            end = offset
+            for line in f:
+                if not line.endswith(b"\n"):
+                    break  # torn write from a crash; cut it off below
+                end += len(line)
+                self._recent.append(json.loads(line))
+                self.total += 1
+                self._since_snapshot += 1
+            f.truncate(end)
+
+    def _snapshot(self):
+        self._log.flush()
+        snap = {"total": self.total, "log_offset": self._log.tell(), "recent": list(self._recent)}
+        fd, tmp = tempfile.mkstemp(suffix=".json", dir=self.path)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(snap, f)
+        os.replace(tmp, self._snapshot_path)
+        self._since_snapshot = 0
+
+    def append(self, entry: dict) -> dict:
+        """Record an entry (seq and timestamp are added); returns the stored dict."""
+        with self._lock:
+            entry = {"seq": self.total, "ts": round(time.time(), 3), **entry}
+            self._recent.append(entry)
+            self.total += 1
+            if self._log is not None:
+                self._log.write(json.dumps(entry, default=str) + "\n")
+                self._log.flush()
+                self._since_snapshot += 1
+                if self._since_snapshot >= self.snapshot_every:
+                    self._snapshot()
+            return entry
+
+    def recent(self, n: int = None) -> list:
+        """The last n entries still in memory (all of them by default), oldest first."""
+        with self._lock:
+            items = list(self._recent)
+        return items if n is None else items[-n:] if n > 0 else []
+
+    def iter_all(self):
+        """Every entry ever recorded, oldest first (from disk when persisted)."""
+        if self._log is None:
+            yield from self.recent()
+            return
+        with self._lock:
+            self._log.flush()
+        with open(self._log_path, encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+    def query(self, intent: str = None, since: float = None, text: str = None, limit: int = None) -> list:
+        """Full-history search by intent, timestamp (epoch seconds) and query substring."""
+        text = text.lower() if text else None
+        out = []
+        for entry in self.iter_all():
+            if intent and entry.get("intent") != intent:
+                continue
+            if since is not None and entry.get("ts", 0) < since:
+                continue
+            if text and text not in str(entry.get("query", "")).lower():
+                continue
+            out.append(entry)
+            if limit and len(out) >= limit:
+                break
+        return out
+
+    def close(self):
+        """Write a final snapshot and close the log (the next start restores from it)."""
+        with self._lock:
+            if self._log is not None and not self._log.closed:
+                self._snapshot()
+                self._log.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._log is not None and self._log.closed
+
+    def __len__(self):
+        return len(self._recent)
+
+    def __iter__(self):
+        return iter(self.recent())
+
+    def __getitem__(self, index):
+        return self.recent()[index]
+
+    def __repr__(self):
+        return f"SessionHistory(session_id={self.session_id!r}, total={self.total}, in_memory={len(self)})"
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def shared_history(session_id: str, history_dir: str = None, **kwargs) -> SessionHistory:
+    """
+    The process-wide SessionHistory for a persisted session (a fresh in-memory
+    one when history_dir is empty), so several RouterAgents for the same
+    session append through one writer and seq numbers stay unique.
+    """
+    if not history_dir:
+        return SessionHistory(session_id, None, **kwargs)
+    path = os.path.abspath(os.path.join(history_dir, _SAFE_ID.sub("_", str(session_id))))
+    with _shared_lock:
+        history = _shared.get(path)
+        if history is None or history.closed:
+            history = _shared[path] = SessionHistory(session_id, history_dir, **kwargs)
+        return history
@@ -0,0 +1,139 @@
+"""
+Date-sorted, month-partitioned index over the typed transaction frame.
+- Rows are sorted by date once, so any [start, end) window is a contiguous
+  slice found with two binary searches (`bounds`) and read without copying.
+- Prefix sums over rows and over days give window totals and per-day totals in
+  O(log n) without touching the rows in between.
+- Per-month category totals/counts (the month partitions) mean a window's
+  category totals only scan the rows of its first and last, partially covered
+  months.
+- `rollups(start, end)` returns a SpendingRollups for the window, so agents can
+  run on it unchanged (see TransactionStore.window).
+"""
+import numpy as np
+import pandas as pd
+from utils.rollups import SpendingRollups
+
+
+def _prefix(values: np.ndarray) -> np.ndarray:
+    out = np.zeros(len(values) + 1, dtype=values.dtype)
+    np.cumsum(values, out=out[1:])
+    return out
+
+
+class TimeIndex:
+    def __init__(self, df: pd.DataFrame):
+        """df: typed transactions (utils.transaction_store schema)."""
+        dates = df["date"].to_numpy()
+        if len(dates) and not (dates[1:] >= dates[:-1]).all():
+            df = df.take(np.argsort(dates, kind="stable")).reset_index(drop=True)
+            dates = df["date"].to_numpy()
+        self.frame = df
+        self.dates = dates
+        amounts = df["amount"].to_numpy(dtype="float64")
+        self._row_prefix = _prefix(amounts)
+
+        # day partitions: row offset of each day; the row prefix sampled at these
+        # offsets is the prefix sum of daily totals
+        day_of_row = dates.astype("datetime64[D]")
+        day_starts = np.flatnonzero(np.r_[True, day_of_row[1:] != day_of_row[:-1]]) if len(dates) else np.array([], int)
+        self.days = day_of_row[day_starts]
+        self._day_offsets = np.r_[day_starts, len(dates)].astype("int64")
+
+        # month partitions: row offsets plus a [month x category] table of totals / counts
+        month_of_row = dates.astype("datetime64[M]")
+        month_starts = np.flatnonzero(np.r_[True, month_of_row[1:] != month_of_row[:-1]]) if len(dates) else np.array([], int)
+        self.months = month_of_row[month_starts]
+        self._month_offsets = np.r_[month_starts, len(dates)].astype("int64")
+        self.categories = df["category"].cat.categories
+        self._codes = df["category"].cat.codes.to_numpy()
+        n_cat = len(self.categories)
+        month_id = np.repeat(np.arange(len(self.months)), np.diff(self._month_offsets))
+        flat = month_id * n_cat + self._codes
+        shape = (len(self.months), n_cat)
+        self._month_cat_total = np.bincount(flat, weights=amounts, minlength=shape[0] * n_cat).reshape(shape)
+        self._month_cat_count = np.bincount(flat, minlength=shape[0] * n_cat).reshape(shape)
+
+    def __len__(self):
+        return len(self.dates)
+
+    def _point(self, value):
+        return pd.Timestamp(value).to_datetime64().astype(self.dates.dtype)
+
+    def bounds(self, start=None, end=None) -> tuple:
+        """Row offsets (lo, hi) of the half-open window [start, end); None means unbounded."""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, self._point(start), "left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, self._point(end), "left"))
+        return lo, max(lo, hi)
+
+    def rows(self, start=None, end=None) -> pd.DataFrame:
+        """Transactions in [start, end), as a slice of the sorted frame."""
+        lo, hi = self.bounds(start, end)
+        return self.frame.iloc[lo:hi]
+
+    def total(self, start=None, end=None) -> float:
+        lo, hi = self.bounds(start, end)
+        return float(self._row_prefix[hi] - self._row_prefix[lo])
+
+    def daily(self, start=None, end=None) -> pd.DataFrame:
+        """Per-day total / count for the window (partial edge days are summed from their rows)."""
+        lo, hi = self.bounds(start, end)
+        if lo == hi:
+            return SpendingRollups().by_day
+        offsets = self._day_offsets
+        d0 = int(np.searchsorted(offsets, lo, "right")) - 1
+        d1 = int(np.searchsorted(offsets, hi, "left"))
+        edges = np.clip(offsets[d0:d1 + 1], lo, hi)
+        totals = self._row_prefix[edges[1:]] - self._row_prefix[edges[:-1]]
+        counts = np.diff(edges)
+        index = pd.DatetimeIndex(self.days[d0:d1].astype(self.dates.dtype), name="date")
+        return pd.DataFrame({"total": totals, "count": counts.astype("int64")}, index=index)
+
+    def monthly(self, start=None, end=None) -> pd.DataFrame:
+        """Per-month total / count for the window, from row prefix sums."""
+        lo, hi = self.bounds(start, end)
+        if lo == hi:
+            return SpendingRollups().by_month
+        m0 = int(np.searchsorted(self._month_offsets, lo, "right")) - 1
+        m1 = int(np.searchsorted(self._month_offsets, hi, "left"))
+        edges = np.clip(self._month_offsets[m0:m1 + 1], lo, hi)
+        totals = self._row_prefix[edges[1:]] - self._row_prefix[edges[:-1]]
+        index = pd.PeriodIndex(self.months[m0:m1], freq="M", name="month")
+        return pd.DataFrame({"total": totals, "count": np.diff(edges).astype("int64")}, index=index)
+
+    def by_category(self, start=None, end=None) -> pd.DataFrame:
+        """
+        Per-category total / count for the window: whole months come from the
+        month partitions, only the rows of partially covered edge months are scanned.
+        """
+        lo, hi = self.bounds(start, end)
+        n_cat = len(self.categories)
+        total = np.zeros(n_cat)
+        count = np.zeros(n_cat, dtype="int64")
+        if lo < hi:
+            offsets = self._month_offsets
+            # months entirely inside [lo, hi)
+            m_first = int(np.searchsorted(offsets, lo, "left"))
+            m_last = int(np.searchsorted(offsets, hi, "right")) - 1
+            if m_first < m_last:
+                total += self._month_cat_total[m_first:m_last].sum(axis=0)
+                count += self._month_cat_count[m_first:m_last].sum(axis=0)
+                edges = [(lo, offsets[m_first]), (offsets[m_last], hi)]
+            else:
+                edges = [(lo, hi)]
+            amounts = self.frame["amount"].to_numpy()
+            for a, b in edges:
+                if a < b:
+                    total += np.bincount(self._codes[a:b], weights=amounts[a:b], minlength=n_cat)
+                    count += np.bincount(self._codes[a:b], minlength=n_cat)
+        agg = pd.DataFrame({"total": total, "count": count},
+                           index=pd.Index(self.categories.astype(str), name="category"))
+        return agg[agg["count"] > 0]
+
+    def rollups(self, start=None, end=None) -> SpendingRollups:
+        """SpendingRollups restricted to [start, end)."""
+        rollups = SpendingRollups()
+        rollups.by_category = self.by_category(start, end)
+        rollups.by_day = self.daily(start, end)
+        rollups.by_month = self.monthly(start, end)
+        return rollups
@@ -0,0 +1,151 @@
+"""
+Lightweight timing spans for the router and agents.
+- `span(name)` times a block, feeds a process-wide latency histogram and, when
+  Sentry is initialized with tracing (see sentry_setup), forwards the block as
+  a Sentry span (a transaction if no span is active yet).
+- `collect()` gathers the spans of one query into a {name: ms} breakdown
+  (RouterAgent attaches it to each session history entry).
+- `exporter` keeps the histograms; dump them with `to_json()` or
+  `to_prometheus()`.
+"""
+import bisect
+import contextvars
+import json
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+# histogram bucket upper bounds in seconds (Prometheus-style, +Inf is implicit)
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_NAME = "finplanner_span_duration_seconds"
+
+_breakdown = contextvars.ContextVar("span_breakdown", default=None)
+
+
+class LatencyHistogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation, capped at the observed max."""
+        if not self.count:
+            return 0.0
+        rank, seen = q * self.count, 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "sum_s": self.sum,
+            "mean_ms": self.sum / self.count * 1000 if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p95_ms": self.quantile(0.95) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+            "buckets": {str(b): n for b, n in zip(self.buckets + ("+Inf",), self.counts)},
+        }
+
+
+class LatencyExporter:
+    """In-process store of one LatencyHistogram per span name (thread-safe)."""
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float):
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = LatencyHistogram(self.buckets)
+            hist.observe(seconds)
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: hist.to_dict() for name, hist in sorted(self._histograms.items())}
+
+    def to_json(self, **kwargs) -> str:
+        return json.dumps(self.snapshot(), **kwargs)
+
+    def to_prometheus(self) -> str:
+        lines = [f"# HELP {METRIC_NAME} Latency of router and agent stages.",
+                 f"# TYPE {METRIC_NAME} histogram"]
+        with self._lock:
+            for name, hist in sorted(self._histograms.items()):
+                cumulative = 0
+                for bound, n in zip(hist.buckets + ("+Inf",), hist.counts):
+                    cumulative += n
+                    lines.append(f'{METRIC_NAME}_bucket{{span="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{METRIC_NAME}_sum{{span="{name}"}} {hist.sum}')
+                lines.append(f'{METRIC_NAME}_count{{span="{name}"}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+
+exporter = LatencyExporter()
+
+
+def _sentry_span(name: str, description: str = None):
+    """A Sentry span/transaction context manager, or None when Sentry tracing is off."""
+    sentry_sdk = sys.modules.get("sentry_sdk")  # only if something already initialized it
+    if sentry_sdk is None or not sentry_sdk.get_client().is_active():
+        return None
+    if sentry_sdk.get_current_span() is None:
+        return sentry_sdk.start_transaction(op=name, name=description or name)
+    return sentry_sdk.start_span(op=name, name=description or name)
+
+
+@contextmanager
+def span(name: str, description: str = None):
+    """Time a block under `name` (histogram + per-query breakdown + Sentry when enabled)."""
+    sentry = _sentry_span(name, description)
+    if sentry is not None:
+        sentry.__enter__()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        exporter.record(name, elapsed)
+        timings = _breakdown.get()
+        if timings is not None:
+            timings[name] = round(timings.get(name, 0.0) + elapsed * 1000, 3)
+        if sentry is not None:
+            sentry.__exit__(*sys.exc_info())
+
+
+@contextmanager
+def collect():
+    """Collect the spans finished inside this block (same thread/task) into a {name: ms} dict."""
+    timings = {}
+    token = _breakdown.set(timings)
+    try:
+        yield timings
+    finally:
+        _breakdown.reset(token)
+
+
+def timed(fn, *args, **kwargs):
+    """Call fn under `collect()`; returns (result, timings). Handy for executor jobs."""
+    with collect() as timings:
+        result = fn(*args, **kwargs)
+    return result, timings
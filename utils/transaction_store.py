@@ -0,0 +1,174 @@
+"""
+Shared, read-only transaction store.
+- Parses the transaction table once into compact typed columns:
+  datetime64 `date`, float `amount`, categorical `merchant` / `category`.
+- One store is built per session and shared by all agents, so agents no
+  longer copy or re-parse the DataFrame on every query.
+- Keeps category/day/month rollups (utils.rollups) that are updated
+  incrementally when new transactions are appended.
+- `window(start, end)` serves a date range through a sorted, month-partitioned
+  utils.time_index.TimeIndex without scanning rows outside it.
+- `save_columns` / `load_columns` persist the typed columns as plain .npy files
+  that can be memory-mapped back without parsing.
+"""
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from utils.rollups import SpendingRollups
+from utils.time_index import TimeIndex
+from utils.tracing import span
+
+COLUMNS = ["date", "amount", "merchant", "category"]
+
+
+def to_typed_frame(transactions: pd.DataFrame) -> pd.DataFrame:
+    """Convert a raw transactions table (e.g. ISO date strings) to the typed schema."""
+    missing = [c for c in COLUMNS if c not in transactions.columns]
+    if missing:
+        raise ValueError(f"transactions missing columns: {missing}")
+    return pd.DataFrame({
+        "date": pd.to_datetime(transactions["date"]),
+        "amount": pd.to_numeric(transactions["amount"]).astype("float64"),
+        "merchant": transactions["merchant"].astype("category"),
+        "category": transactions["category"].astype("category"),
+    })
+
+
+def is_typed_frame(df: pd.DataFrame) -> bool:
+    """True if df already has exactly the typed schema (so it can be used without conversion)."""
+    return (list(df.columns) == COLUMNS
+            and pd.api.types.is_datetime64_dtype(df["date"])
+            and df["amount"].dtype == "float64"
+            and isinstance(df["merchant"].dtype, pd.CategoricalDtype)
+            and isinstance(df["category"].dtype, pd.CategoricalDtype))
+
+
+def save_columns(df: pd.DataFrame, directory: str):
+    """Write a typed frame as one .npy per column (+ category labels in meta.json)."""
+    os.makedirs(directory, exist_ok=True)
+    dates = df["date"].to_numpy()
+    np.save(os.path.join(directory, "date.npy"), dates.view("int64"))
+    np.save(os.path.join(directory, "amount.npy"), df["amount"].to_numpy(dtype="float64"))
+    meta = {"rows": len(df), "date_unit": np.datetime_data(dates.dtype)[0]}
+    for col in ("merchant", "category"):
+        values = df[col].cat
+        np.save(os.path.join(directory, f"{col}_codes.npy"), values.codes.to_numpy())
+        meta[col] = values.categories.astype(str).tolist()
+    with open(os.path.join(directory, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def load_columns(directory: str, mmap: bool = True) -> pd.DataFrame:
+    """
+    Read columns written by save_columns. With mmap=True the numeric arrays are
+    memory-mapped read-only, so load time and private memory stay small and
+    several processes can share the same pages.
+    """
+    mode = "r" if mmap else None
+    with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    def load(name):
+        return np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mode)
+
+    data = {
+        "date": pd.Series(load("date").view(f"datetime64[{meta['date_unit']}]"), copy=False),
+        "amount": pd.Series(load("amount"), copy=False),
+    }
+    for col in ("merchant", "category"):
+        dtype = pd.CategoricalDtype(meta[col])
+        data[col] = pd.Series(pd.Categorical.from_codes(load(f"{col}_codes"), dtype=dtype), copy=False)
+    return pd.DataFrame(data, copy=False)
+
+
+class TransactionStore:
+    def __init__(self, transactions: pd.DataFrame):
+        self._frame = transactions if is_typed_frame(transactions) else to_typed_frame(transactions)
+        self._pending = []
+        self._rollups = None
+        self._index = None  # (version, TimeIndex), built on the first windowed query
+        # agents may read the store from worker threads (RouterAgent.handle_many)
+        self._lock = threading.RLock()
+        # bumped on every append; lets callers key caches on the data version
+        self.version = 0
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """
+        Typed transactions. Returned as a shallow copy: no data is duplicated,
+        but adding/replacing columns on it never touches the shared store.
+        """
+        with self._lock:
+            if self._pending:
+                merged = pd.concat([self._frame, *self._pending], ignore_index=True)
+                for col in ("merchant", "category"):
+                    merged[col] = merged[col].astype("category")
+                self._frame = merged
+                self._pending = []
+            return self._frame.copy(deep=False)
+
+    @property
+    def rollups(self) -> SpendingRollups:
+        """Category/day/month totals, computed on first use and kept up to date."""
+        with self._lock:
+            if self._rollups is None:
+                with span("store.rollups"):
+                    self._rollups = SpendingRollups.from_frame(self.frame)
+            return self._rollups
+
+    @property
+    def time_index(self) -> TimeIndex:
+        """Date-sorted index of the current rows, rebuilt lazily after appends."""
+        with self._lock:
+            if self._index is None or self._index[0] != self.version:
+                with span("store.time_index"):
+                    self._index = (self.version, TimeIndex(self.frame))
+            return self._index[1]
+
+    def window(self, start=None, end=None) -> "TransactionStore":
+        """
+        Read-only store over transactions in [start, end) (None = open ended).
+        Rows are a slice of the index's sorted frame and the rollups come from
+        its prefix sums / month partitions, so nothing outside the window is scanned.
+        """
+        index = self.time_index
+        with span("store.window"):
+            store = TransactionStore(index.rows(start, end))
+            store._rollups = index.rollups(start, end)
+        return store
+
+    def append(self, transactions: pd.DataFrame):
+        """
+        Add new transactions. Rollups are updated from the batch alone; the row
+        table is only concatenated the next time `frame` is read.
+        """
+        batch = to_typed_frame(transactions)
+        if batch.empty:
+            return
+        with self._lock:
+            self._pending.append(batch)
+            if self._rollups is not None:
+                self._rollups.update(batch)
+            self.version += 1
+
+    def __getstate__(self):
+        # locks cannot be pickled (e.g. when shipping the store to a process pool)
+        state = self.__dict__.copy()
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._frame) + sum(len(b) for b in self._pending)
+
+
+def as_store(transactions) -> TransactionStore:
+    """Accept either a TransactionStore (shared as-is) or a raw DataFrame."""
+    if isinstance(transactions, TransactionStore):
+        return transactions
+    return TransactionStore(transactions)
@@ -1,36 +1,134 @@
-
 """
 Simple charting utility that creates a spending breakdown bar chart and saves to PNG.
 Uses matplotlib (no fixed colors/style so it's portable) as required by project.
+The plot_* functions take pre-aggregated totals (e.g. from utils.rollups);
+the save_* functions aggregate a raw transactions frame first.
+
+Charts are drawn on standalone `Figure` objects with the Agg canvas rather than
+pyplot's global state, so renders are thread-safe and can run in a worker pool.
+`render_category_chart` / `render_timeseries_chart` name the PNG after a hash of
+the data being plotted and skip rendering entirely when that file exists;
+only the CHART_KEEP most recently used PNGs of each kind are kept per folder.
+Timeseries are resampled / LTTB-downsampled (utils.downsample) before plotting.
 """
-import matplotlib.pyplot as plt
+import hashlib
+import os
+import re
+import tempfile
+from functools import partial
 import pandas as pd
 from pathlib import Path
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from utils.downsample import MAX_POINTS, downsample, resample_totals
+from utils.tracing import span
 
-def save_category_breakdown(df: pd.DataFrame, out_path: str = "spending_breakdown.png"):
-    """Aggregate by category and save a bar chart to out_path."""
-    agg = df.groupby("category")["amount"].sum().abs().sort_values(ascending=False)
-    plt.figure(figsize=(8,5))
-    agg.plot(kind="bar")
-    plt.title("Spending by Category (absolute values)")
-    plt.xlabel("Category")
-    plt.ylabel("Total Amount")
+_TITLES = {"day": "Daily", "week": "Weekly", "month": "Monthly"}
+# cached PNGs kept per chart kind and folder; at least as many as the app caches
+# spending analyses (st.cache_data max_entries=64), so cached paths stay valid
+CHART_KEEP = int(os.getenv("CHART_KEEP", "64"))
+
+def chart_key(kind: str, data: pd.Series) -> str:
+    """Content hash of a chart: its kind plus the exact index/values plotted."""
+    h = hashlib.sha256(kind.encode())
+    h.update(pd.util.hash_pandas_object(data, index=True).values.tobytes())
+    return h.hexdigest()[:16]
+
+def _save(fig: Figure, out_path: str):
+    # write to a temp file and rename, so concurrent readers never see a partial PNG
     Path(out_path).parent.mkdir(parents=True, exist_ok=True)
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+    fd, tmp = tempfile.mkstemp(suffix=".png", dir=str(Path(out_path).parent))
+    os.close(fd)
+    try:
+        FigureCanvasAgg(fig)
+        fig.tight_layout()
+        fig.savefig(tmp)
+        os.replace(tmp, out_path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+def _draw_bar(agg: pd.Series, out_path: str):
+    fig = Figure(figsize=(8,5))
+    ax = fig.add_subplot()
+    ax.bar(agg.index.astype(str), agg.values)
+    ax.tick_params(axis="x", labelrotation=90)
+    ax.set_title("Spending by Category (absolute values)")
+    ax.set_xlabel("Category")
+    ax.set_ylabel("Total Amount")
+    _save(fig, out_path)
+
+def _draw_line(agg: pd.Series, out_path: str, resolution: str = "day"):
+    fig = Figure(figsize=(10,4))
+    ax = fig.add_subplot()
+    ax.plot(agg.index, agg.values)
+    ax.set_title(f"{_TITLES[resolution]} Spending (absolute)")
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Amount")
+    _save(fig, out_path)
+
+def _category_series(totals: pd.Series) -> pd.Series:
+    return totals.abs().sort_values(ascending=False)
+
+def _daily_series(daily: pd.Series, resolution: str = "day", max_points: int = MAX_POINTS) -> pd.Series:
+    # bucket first, then take magnitudes, then cap the number of points drawn
+    return downsample(resample_totals(daily, resolution).abs(), max_points)
+
+def plot_category_totals(totals: pd.Series, out_path: str = "spending_breakdown.png"):
+    """Bar chart of per-category totals (absolute values), saved to out_path."""
+    _draw_bar(_category_series(totals), out_path)
     return out_path
 
-def save_timeseries(df: pd.DataFrame, out_path: str = "spending_timeseries.png"):
-    """Daily spending timeseries (sum per date)."""
-    df["date"] = pd.to_datetime(df["date"])
-    agg = df.groupby("date")["amount"].sum().abs().sort_index()
-    plt.figure(figsize=(10,4))
-    agg.plot()
-    plt.title("Daily Spending (absolute)")
-    plt.xlabel("Date")
-    plt.ylabel("Amount")
-    plt.tight_layout()
-    plt.savefig(out_path)
-    plt.close()
+def plot_daily_totals(daily: pd.Series, out_path: str = "spending_timeseries.png",
+                      resolution: str = "day", max_points: int = MAX_POINTS):
+    """Line chart of per-day totals (absolute values), saved to out_path."""
+    _draw_line(_daily_series(daily, resolution, max_points), out_path, resolution)
     return out_path
+
+def _prune(out_dir: str, kind: str, keep: int = CHART_KEEP):
+    """Delete all but the `keep` most recently used content-addressed PNGs of `kind`."""
+    pattern = re.compile(rf"{re.escape(kind)}-[0-9a-f]{{16}}\.png")
+    charts = []
+    with os.scandir(out_dir) as entries:
+        for entry in entries:
+            if pattern.fullmatch(entry.name):
+                try:
+                    charts.append((entry.stat().st_mtime_ns, entry.path))
+                except FileNotFoundError:
+                    pass  # pruned concurrently
+    for _, path in sorted(charts, reverse=True)[keep:]:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def _render_cached(kind: str, agg: pd.Series, out_dir: str, draw) -> str:
+    out_path = os.path.join(out_dir, f"{kind}-{chart_key(kind, agg)}.png")
+    try:
+        os.utime(out_path)  # cache hit: mark as recently used so pruning keeps it
+    except FileNotFoundError:
+        with span(f"chart.{kind}"):
+            draw(agg, out_path)
+        _prune(out_dir, kind)
+    return out_path
+
+def render_category_chart(totals: pd.Series, out_dir: str = "./outputs") -> str:
+    """Content-addressed category chart under out_dir; cached PNGs are reused as-is."""
+    return _render_cached("spending_breakdown", _category_series(totals), out_dir, _draw_bar)
+
+def render_timeseries_chart(daily: pd.Series, out_dir: str = "./outputs",
+                            resolution: str = "day", max_points: int = MAX_POINTS) -> str:
+    """Content-addressed spending timeseries under out_dir; cached PNGs are reused as-is."""
+    kind = "spending_timeseries" if resolution == "day" else f"spending_timeseries_{resolution}"
+    draw = partial(_draw_line, resolution=resolution)
+    return _render_cached(kind, _daily_series(daily, resolution, max_points), out_dir, draw)
+
+def save_category_breakdown(df: pd.DataFrame, out_path: str = "spending_breakdown.png"):
+    """Aggregate by category and save a bar chart to out_path."""
+    return plot_category_totals(df.groupby("category", observed=True)["amount"].sum(), out_path)
+
+def save_timeseries(df: pd.DataFrame, out_path: str = "spending_timeseries.png",
+                    resolution: str = "day", max_points: int = MAX_POINTS):
+    """Spending timeseries (sum per date, then per resolution bucket). df is not modified."""
+    dates = pd.to_datetime(df["date"]).dt.normalize()
+    return plot_daily_totals(df["amount"].groupby(dates).sum(), out_path, resolution, max_points)